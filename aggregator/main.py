@@ -2,11 +2,42 @@ import redis
 import json
 import os
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from datetime import datetime
 
 # Configuration Redis
 redis_client = redis.Redis(host=os.environ.get('REDIS_HOST', 'redis'), port=6379, db=0)
 
+# Nombre de modèles retenus dans le classement par ville
+TOP_MODELS_LIMIT = int(os.environ.get('TOP_MODELS_LIMIT', 5))
+
+# Flux Redis sur lequel les workers publient leurs résultats partiels
+RESULTS_STREAM = 'task_results'
+
+# Intervalle minimal (s) entre deux publications des résultats provisoires
+PARTIAL_RESULTS_INTERVAL = float(os.environ.get('PARTIAL_RESULTS_INTERVAL', 1.0))
+
+# Nombre de résultats agrégés de jobs conservés (les plus récents)
+RESULTS_HISTORY_SIZE = int(os.environ.get('RESULTS_HISTORY_SIZE', 10))
+
+# Nombre de périmètres (jobs filtrés par villes, type ou dates) dont les
+# derniers résultats sont conservés dans results:scope:<id>
+SCOPED_RESULTS_SIZE = int(os.environ.get('SCOPED_RESULTS_SIZE', 100))
+
+# Durée de conservation (s) de l'état intermédiaire d'un job ; 0 pour le conserver indéfiniment
+JOB_STATE_TTL = int(os.environ.get('JOB_STATE_TTL', 3600))
+
+# Agrégations en cours, par job : état fusionné et tâches déjà intégrées
+running_jobs = {}
+
+# Délai (s) sans nouveau résultat au-delà duquel l'agrégation en cours d'un job
+# est abandonnée (job en échec, notification de fin perdue) ; si le job se
+# termine malgré tout, ses résultats sont agrégés depuis Redis
+STALE_JOB_TIMEOUT = int(os.environ.get('STALE_JOB_TIMEOUT', JOB_STATE_TTL or 3600))
+
+# Derniers jobs finalisés, pour ignorer les résultats arrivant en retard
+finalized_jobs = deque(maxlen=1000)
+
 def merge_monthly_revenues(results_list):
     """Fusionne les chiffres d'affaires mensuels par ville."""
     merged = defaultdict(lambda: defaultdict(float))
@@ -31,22 +62,28 @@ def merge_sales_rental_distribution(results_list):
     
     return {city: dict(types) for city, types in merged.items()}
 
-def merge_top_models(results_list):
-    """Fusionne et recalcule les modèles les plus populaires."""
-    # Fusionner tous les comptages
-    all_counts = defaultdict(lambda: defaultdict(int))
+def merge_model_counts(results_list):
+    """Fusionne les comptages complets de modèles par ville."""
+    merged = defaultdict(lambda: defaultdict(int))
     
     for result in results_list:
-        top_models = result.get('top_models', {})
-        for city, models in top_models.items():
+        model_counts = result.get('model_counts', {})
+        for city, models in model_counts.items():
             for model, count in models.items():
-                all_counts[city][model] += count
+                merged[city][model] += count
     
-    # Sélectionner les top 5 pour chaque ville
+    return {city: dict(models) for city, models in merged.items()}
+
+def select_top_models(model_counts, limit=TOP_MODELS_LIMIT):
+    """Sélectionne les modèles les plus populaires de chaque ville.
+
+    Les comptages étant complets, le classement est exact quel que soit le
+    nombre de chunks.
+    """
     top_models = {}
-    for city, models in all_counts.items():
-        # Trier par nombre et prendre les 5 premiers
-        sorted_models = sorted(models.items(), key=lambda x: x[1], reverse=True)[:5]
+    for city, models in model_counts.items():
+        # Trier par nombre décroissant puis par nom pour un classement stable
+        sorted_models = sorted(models.items(), key=lambda x: (-x[1], x[0]))[:limit]
         top_models[city] = dict(sorted_models)
     
     return top_models
@@ -64,52 +101,360 @@ def calculate_sales_percentage(distribution):
     
     return percentages
 
+def fold_into(merged, result):
+    """Ajoute en place le résultat d'une tâche à un état fusionné : coût proportionnel au résultat seul."""
+    for dimension in ('ca_mensuel_ville', 'repartition_vente_location', 'model_counts'):
+        target = merged.setdefault(dimension, {})
+        for city, values in result.get(dimension, {}).items():
+            city_values = target.setdefault(city, {})
+            for key, value in values.items():
+                city_values[key] = city_values.get(key, 0) + value
+
+def merge_partial_results(results_list):
+    """Fusionne des résultats partiels (de tâches ou déjà fusionnés)."""
+    return {
+        'ca_mensuel_ville': merge_monthly_revenues(results_list),
+        'repartition_vente_location': merge_sales_rental_distribution(results_list),
+        'model_counts': merge_model_counts(results_list)
+    }
+
+def finalize_results(merged):
+    """Ajoute les indicateurs dérivés (top modèles, pourcentages) aux résultats fusionnés."""
+    aggregated = dict(merged)
+    aggregated['top_models'] = select_top_models(aggregated['model_counts'])
+    aggregated['pourcentage_vente_location'] = calculate_sales_percentage(
+        aggregated['repartition_vente_location']
+    )
+    return aggregated
+
+def write_results_layout(pipe, aggregated, previous_cities):
+    """Publie les résultats sous une forme adaptée aux requêtes de l'API.
+
+    - results:villes : liste des villes
+    - results:ca_mensuel:<ville> : hash mois -> chiffre d'affaires
+    - results:repartition:<ville> / results:pourcentage:<ville> : hash type -> valeur
+    - results:modeles:<ville> : sorted set modèle -> nombre de transactions
+    """
+    for city in previous_cities:
+        for dimension in ('ca_mensuel', 'repartition', 'pourcentage', 'modeles'):
+            pipe.delete(f"results:{dimension}:{city}")
+    pipe.delete('results:villes')
+    
+    cities = list(aggregated['ca_mensuel_ville'].keys())
+    if cities:
+        pipe.rpush('results:villes', *cities)
+    for city, months in aggregated['ca_mensuel_ville'].items():
+        if months:
+            pipe.hset(f"results:ca_mensuel:{city}", mapping=months)
+    for city, types in aggregated['repartition_vente_location'].items():
+        if types:
+            pipe.hset(f"results:repartition:{city}", mapping=types)
+    for city, types in aggregated['pourcentage_vente_location'].items():
+        if types:
+            pipe.hset(f"results:pourcentage:{city}", mapping=types)
+    for city, models in aggregated['model_counts'].items():
+        if models:
+            pipe.zadd(f"results:modeles:{city}", models)
+
+def store_job_results(job_id, merged):
+    """Stocke les résultats agrégés définitifs d'un job.
+
+    Les résultats du job sont fusionnés dans l'état cumulé de son fichier
+    source (results:state:<fichier>) : un job incrémental n'apporte que les
+    lignes ajoutées depuis le repère ingestion:watermark:<fichier>, un job
+    complet remplace l'état. L'état cumulé, le nouveau repère et les
+    résultats publiés sont écrits dans une même transaction ; si le repère a
+    changé depuis le lancement du job (autre job concurrent), ses résultats
+    sont conservés pour le job seul sans être fusionnés. Les résultats d'un
+    job limité à un périmètre sont stockés sous results:scope:<id> et ne
+    remplacent pas les résultats publiés.
+    """
+    data_path, processing_mode, watermark_start, watermark_end, watermark_fingerprint, scope, scope_id = [
+        value.decode('utf-8') if value is not None else None
+        for value in redis_client.hmget(f"job:{job_id}", 'data_path', 'processing_mode',
+                                        'watermark_start', 'watermark_end', 'watermark_fingerprint',
+                                        'scope', 'scope_id')
+    ]
+    watermark_key = f"ingestion:watermark:{data_path}"
+    state_key = f"results:state:{data_path}"
+    previous_cities = [city.decode('utf-8') for city in redis_client.lrange('results:villes', 0, -1)]
+    
+    with redis_client.pipeline() as pipe:
+        while True:
+            try:
+                cumulative = merged
+                publish = scope is None
+                if data_path and processing_mode == 'incremental':
+                    # Le repère ne doit pas bouger entre la lecture de l'état et l'écriture
+                    pipe.watch(watermark_key)
+                    offset = pipe.hget(watermark_key, 'offset')
+                    if offset is None or offset.decode('utf-8') != watermark_start:
+                        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️  Repère de {data_path} modifié pendant le job {job_id}: résultats non fusionnés")
+                        publish = False
+                    else:
+                        state_json = pipe.get(state_key)
+                        if state_json:
+                            cumulative = merge_partial_results([json.loads(state_json), merged])
+                
+                aggregated = finalize_results(cumulative)
+                aggregated_json = json.dumps(aggregated)
+                
+                # Transaction : l'API ne voit jamais un mélange d'anciens et de nouveaux résultats
+                pipe.multi()
+                if publish:
+                    write_results_layout(pipe, aggregated, previous_cities)
+                    pipe.set('latest_results', aggregated_json)
+                    if data_path:
+                        pipe.set(state_key, json.dumps(cumulative))
+                        pipe.hset(watermark_key, mapping={
+                            'offset': watermark_end,
+                            'fingerprint': watermark_fingerprint,
+                            'job_id': job_id,
+                            'updated_at': datetime.now().isoformat()
+                        })
+                if scope_id:
+                    pipe.hset(f"results:scope:{scope_id}", mapping={
+                        'scope': scope,
+                        'results': aggregated_json,
+                        'job_id': job_id,
+                        'updated_at': datetime.now().isoformat()
+                    })
+                    pipe.zadd('results:scopes', {scope_id: time.time()})
+                pipe.set(f"job:{job_id}:aggregated_results", aggregated_json)
+                pipe.zadd('results:history', {job_id: time.time()})
+                pipe.delete(f"job:{job_id}:partial_results")
+                if publish:
+                    # Nouvelle génération seulement si les résultats publiés changent :
+                    # un job limité à un périmètre n'invalide pas les caches de l'API
+                    pipe.incr('results_generation')
+                replies = pipe.execute()
+                generation = replies[-1] if publish else None
+                break
+            except redis.WatchError:
+                continue
+    
+    finalized_jobs.append(job_id)
+    
+    # Invalide les caches de l'API
+    if publish:
+        redis_client.publish('results_updated', generation)
+    
+    trim_results_history()
+    if scope_id:
+        trim_scoped_results()
+    return aggregated
+
+def trim_scoped_results():
+    """Supprime les résultats des périmètres au-delà des SCOPED_RESULTS_SIZE plus récemment calculés."""
+    evicted = redis_client.zrange('results:scopes', 0, -SCOPED_RESULTS_SIZE - 1)
+    if not evicted:
+        return
+    
+    pipe = redis_client.pipeline()
+    pipe.delete(*[f"results:scope:{scope_id.decode('utf-8')}" for scope_id in evicted])
+    pipe.zrem('results:scopes', *evicted)
+    pipe.execute()
+
+def trim_results_history():
+    """Supprime les résultats agrégés des jobs au-delà des RESULTS_HISTORY_SIZE plus récents.
+
+    La mémoire libérée est ajoutée au compteur reclaimed_bytes du job concerné.
+    """
+    evicted = redis_client.zrange('results:history', 0, -RESULTS_HISTORY_SIZE - 1)
+    if not evicted:
+        return
+    
+    pipe = redis_client.pipeline(transaction=False)
+    for job_id in evicted:
+        pipe.strlen(f"job:{job_id.decode('utf-8')}:aggregated_results")
+    sizes = pipe.execute()
+    
+    pipe = redis_client.pipeline()
+    for job_id, size in zip(evicted, sizes):
+        job_id = job_id.decode('utf-8')
+        pipe.delete(f"job:{job_id}:aggregated_results")
+        if size:
+            pipe.hincrby(f"job:{job_id}", 'reclaimed_bytes', size)
+    pipe.zrem('results:history', *evicted)
+    pipe.execute()
+    
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️  Historique des résultats: {len(evicted)} job(s) ancien(s) supprimé(s), {sum(sizes)} octets libérés")
+
+def record_aggregator_span(job_id, span):
+    """Enregistre le span de l'aggregator dans le hash du job (timeline du job)."""
+    redis_client.hset(f"job:{job_id}", 'aggregator_span', json.dumps(span))
+
 def aggregate_job_results(job_id):
-    """Agrège les résultats de toutes les tâches d'un job."""
+    """Agrège les résultats de toutes les tâches d'un job.
+
+    Chemin de secours lorsque l'agrégation incrémentale est incomplète
+    (aggregator redémarré en cours de job, par exemple).
+    """
     print(f"Agrégation des résultats pour le job {job_id}")
+    span = {'mode': 'full', 'started_at': time.time()}
+    phase_start = time.perf_counter()
     
     # Récupérer les IDs de toutes les tâches terminées
     task_ids = redis_client.smembers(f"job:{job_id}:completed_tasks")
     
     # Récupérer les résultats de chaque tâche
-    results_list = []
+    results_json = []
     for task_id in task_ids:
         task_id = task_id.decode('utf-8')
         result_json = redis_client.get(f"{task_id}:results")
         
         if result_json:
-            results_list.append(json.loads(result_json))
+            results_json.append(result_json)
+    span['fetch'] = time.perf_counter() - phase_start
     
-    # Fusionner les résultats
-    aggregated = {
-        'ca_mensuel_ville': merge_monthly_revenues(results_list),
-        'repartition_vente_location': merge_sales_rental_distribution(results_list),
-        'top_models': merge_top_models(results_list)
-    }
-    
-    # Calculs supplémentaires
-    aggregated['pourcentage_vente_location'] = calculate_sales_percentage(
-        aggregated['repartition_vente_location']
-    )
+    phase_start = time.perf_counter()
+    results_list = [json.loads(result_json) for result_json in results_json]
+    span['decode'] = time.perf_counter() - phase_start
+    phase_start = time.perf_counter()
+    merged = merge_partial_results(results_list)
+    span['merge'] = time.perf_counter() - phase_start
     
-    # Stocker les résultats agrégés
-    redis_client.set('latest_results', json.dumps(aggregated))
-    redis_client.set(f"job:{job_id}:aggregated_results", json.dumps(aggregated))
+    phase_start = time.perf_counter()
+    aggregated = store_job_results(job_id, merged)
+    span['store'] = time.perf_counter() - phase_start
+    span.update({'results_merged': len(results_list), 'ended_at': time.time()})
+    record_aggregator_span(job_id, span)
     
     print(f"Résultats agrégés pour le job {job_id}")
     return aggregated
 
+def fold_task_result(job_id, task_id, result_json):
+    """Intègre le résultat (JSON) d'une tâche dans l'état courant de son job, en place.
+
+    Le temps de décodage et de fusion est cumulé dans le span du job.
+    """
+    if job_id in finalized_jobs:
+        return None
+    
+    now = time.time()
+    state = running_jobs.setdefault(job_id, {
+        'results': {},
+        'task_ids': set(),
+        'tasks_count': None,
+        'last_publish': 0.0,
+        'span': {'mode': 'incremental', 'started_at': now, 'decode': 0.0, 'merge': 0.0}
+    })
+    state['span']['last_result_at'] = now
+    
+    # Un même résultat peut être reçu deux fois (tâche relancée)
+    if task_id not in state['task_ids']:
+        phase_start = time.perf_counter()
+        result = json.loads(result_json)
+        state['span']['decode'] += time.perf_counter() - phase_start
+        phase_start = time.perf_counter()
+        fold_into(state['results'], result)
+        state['span']['merge'] += time.perf_counter() - phase_start
+        state['task_ids'].add(task_id)
+    
+    return state
+
+def try_finalize(job_id):
+    """Publie les résultats définitifs si toutes les tâches du job ont été intégrées."""
+    state = running_jobs.get(job_id)
+    if state is None:
+        return False
+    
+    # Le nombre de tâches n'est connu qu'une fois la distribution terminée
+    if state['tasks_count'] is None:
+        tasks_count = redis_client.hget(f"job:{job_id}", 'tasks_count')
+        if tasks_count is None:
+            return False
+        state['tasks_count'] = int(tasks_count)
+    
+    if len(state['task_ids']) < state['tasks_count']:
+        return False
+    
+    span = state['span']
+    phase_start = time.perf_counter()
+    store_job_results(job_id, state['results'])
+    span.update({'store': time.perf_counter() - phase_start, 'results_merged': len(state['task_ids']), 'ended_at': time.time()})
+    record_aggregator_span(job_id, span)
+    del running_jobs[job_id]
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Résultats agrégés pour le job {job_id} ({state['tasks_count']} tâches intégrées au fil de l'eau)")
+    return True
+
+def publish_partial_results(job_id, state, force=False):
+    """Rend les résultats provisoires d'un job consultables pendant son exécution."""
+    now = time.time()
+    if not force and now - state['last_publish'] < PARTIAL_RESULTS_INTERVAL:
+        return
+    
+    state['last_publish'] = now
+    # Expire si le job échoue et n'est jamais finalisé
+    redis_client.set(f"job:{job_id}:partial_results", json.dumps({
+        'completed_tasks': len(state['task_ids']),
+        'total_tasks': state['tasks_count'],
+        'updated_at': datetime.now().isoformat(),
+        'results': finalize_results(state['results'])
+    }), ex=JOB_STATE_TTL or None)
+
+def evict_stale_jobs():
+    """Abandonne les agrégations en cours sans nouveau résultat depuis STALE_JOB_TIMEOUT secondes."""
+    now = time.time()
+    for job_id in [job_id for job_id, state in running_jobs.items()
+                   if now - state['span']['last_result_at'] > STALE_JOB_TIMEOUT]:
+        del running_jobs[job_id]
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️  Agrégation du job {job_id} abandonnée: aucun résultat depuis {STALE_JOB_TIMEOUT}s")
+
+def handle_tasks_completed(job_id):
+    """Traite la notification de fin de job envoyée par l'orchestrator."""
+    if job_id in finalized_jobs or try_finalize(job_id):
+        return
+    
+    # État incrémental absent ou incomplet : agrégation complète depuis Redis
+    running_jobs.pop(job_id, None)
+    aggregate_job_results(job_id)
+
 def main():
-    print("Aggregator démarré, en attente de notifications...")
+    print("Aggregator démarré, en attente de résultats...")
     
-    # S'abonner au canal de notification
+    # S'abonner au canal de notification de fin de job
     pubsub = redis_client.pubsub()
     pubsub.subscribe('tasks_completed')
     
-    for message in pubsub.listen():
-        if message['type'] == 'message':
-            job_id = message['data'].decode('utf-8')
-            aggregate_job_results(job_id)
+    # Seuls les résultats publiés après le démarrage sont lus ; un identifiant
+    # explicite (et non '$') évite de perdre les entrées arrivées entre deux XREAD
+    last_entry = redis_client.xrevrange(RESULTS_STREAM, count=1)
+    last_id = last_entry[0][0] if last_entry else '0-0'
+    
+    while True:
+        entries = redis_client.xread({RESULTS_STREAM: last_id}, count=100, block=1000)
+        
+        updated_jobs = set()
+        completed_jobs = []
+        for _, messages in entries:
+            for message_id, fields in messages:
+                last_id = message_id
+                job_id = fields[b'job_id'].decode('utf-8')
+                
+                # Fin de job signalée par l'orchestrator dans le flux
+                if fields.get(b'event') == b'tasks_completed':
+                    completed_jobs.append(job_id)
+                    continue
+                
+                task_id = fields[b'task_id'].decode('utf-8')
+                if fold_task_result(job_id, task_id, fields[b'results']) is not None:
+                    updated_jobs.add(job_id)
+        
+        for job_id in updated_jobs:
+            if not try_finalize(job_id):
+                publish_partial_results(job_id, running_jobs[job_id])
+        
+        for job_id in completed_jobs:
+            handle_tasks_completed(job_id)
+        
+        # Notifications de l'orchestrator (non bloquant)
+        message = pubsub.get_message(ignore_subscribe_messages=True)
+        while message:
+            handle_tasks_completed(message['data'].decode('utf-8'))
+            message = pubsub.get_message(ignore_subscribe_messages=True)
+        
+        evict_stale_jobs()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,129 +1,364 @@
-from flask import Flask, jsonify, request
+from quart import Quart, jsonify, request, make_response, g
 import redis
+import redis.asyncio as aioredis
+import asyncio
 import json
 import os
 import uuid
+import hashlib
+import io
+import marshal
+import pstats
 from datetime import datetime
 import time
 
-app = Flask(__name__)
+app = Quart(__name__)
 
-# Configuration Redis
-redis_client = redis.Redis(host=os.environ.get('REDIS_HOST', 'redis'), port=6379, db=0)
+# Configuration Redis : client asynchrone sur un pool de connexions partagé
+# par toutes les requêtes en cours
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 64))
+redis_pool = aioredis.BlockingConnectionPool(host=os.environ.get('REDIS_HOST', 'redis'), port=6379, db=0,
+                                             max_connections=REDIS_MAX_CONNECTIONS)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
 
-@app.route('/api/ca-mensuel', methods=['GET'])
-def get_monthly_revenue():
-    """API pour obtenir le chiffre d'affaires mensuel par ville."""
-    # Paramètres optionnels
-    ville = request.args.get('ville')
-    mois = request.args.get('mois')  # Format: YYYY-MM
+# Nombre de modèles renvoyés par défaut par /api/top-modeles
+TOP_MODELS_LIMIT = int(os.environ.get('TOP_MODELS_LIMIT', 5))
+
+# Cache des réponses rendues pour la génération de résultats courante
+# (compteur incrémenté par l'aggregator à chaque nouvelle publication)
+results_cache = {
+    'generation': None,
+    'responses': {},
+    'stale': True,
+    'checked_at': 0.0
+}
+cache_lock = asyncio.Lock()
+
+# Intervalle (s) de vérification de la génération, au cas où une invalidation pub/sub serait perdue
+CACHE_CHECK_INTERVAL = float(os.environ.get('CACHE_CHECK_INTERVAL', 5.0))
+
+# Nombre maximal de réponses rendues conservées pour une génération
+MAX_CACHED_RESPONSES = int(os.environ.get('MAX_CACHED_RESPONSES', 10000))
+
+# Intervalle (s) de lecture du statut d'un job pour le flux d'événements SSE
+JOB_EVENTS_INTERVAL = float(os.environ.get('JOB_EVENTS_INTERVAL', 0.5))
+
+# Statuts après lesquels un job n'évolue plus
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# Pagination de /api/jobs
+JOBS_PAGE_SIZE = 10
+MAX_JOBS_PAGE_SIZE = 100
+
+# Valeurs possibles du filtre `type` d'un périmètre
+TRANSACTION_TYPES = ('vente', 'location')
+
+# Modes de profilage des tâches d'un job par les workers : échantillonnage des
+# piles (format replié des flamegraphs) ou cProfile (statistiques pstats)
+PROFILE_MODES = ('sampling', 'cprofile')
+
+# Nombre de lignes (piles ou fonctions) des profils rendus par défaut
+PROFILE_LIMIT = 30
+
+# Une tâche est signalée comme retardataire dans la timeline d'un job si sa
+# durée dépasse STRAGGLER_FACTOR fois la durée médiane des tâches
+STRAGGLER_FACTOR = float(os.environ.get('STRAGGLER_FACTOR', 2.0))
+
+# Un worker est considéré vivant si son dernier battement date de moins de WORKER_TTL secondes
+WORKER_TTL = int(os.environ.get('WORKER_TTL', 15))
+
+# Bornes (s) de l'histogramme des latences des requêtes de l'API
+REQUEST_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Latences des requêtes servies par ce processus, par (méthode, route, statut) :
+# compteurs par intervalle (non cumulés), somme et nombre d'observations
+request_latency = {}
+
+# Phases d'une tâche relevant de la lecture et de la (dé)sérialisation des
+# données ; les autres (résumé, réducteurs) relèvent du calcul
+IO_PHASES = ('fetch', 'decode', 'serialize', 'write')
+
+def parse_scope(params):
+    """Valide et normalise un périmètre : villes, type, date_from/date_to (AAAA-MM-JJ, bornes incluses).
+
+    `params` est le corps JSON de /api/process ou la query string de
+    /api/results (villes séparées par des virgules). La forme normalisée
+    (filtres renseignés, villes triées) est celle utilisée par
+    l'orchestrator. Renvoie (périmètre, message d'erreur ou None).
+    """
+    scope = {}
+    villes = params.get('villes')
+    if isinstance(villes, str):
+        villes = [ville.strip() for ville in villes.split(',') if ville.strip()]
+    if villes is not None and not (isinstance(villes, list) and all(isinstance(ville, str) for ville in villes)):
+        return None, "villes doit être une liste de noms de villes"
+    if villes:
+        scope['villes'] = sorted(set(villes))
     
-    # Récupération des derniers résultats
-    results_json = redis_client.get('latest_results')
+    if params.get('type'):
+        if params['type'] not in TRANSACTION_TYPES:
+            return None, "type doit valoir 'vente' ou 'location'"
+        scope['type'] = params['type']
     
-    if not results_json:
+    dates = {}
+    for key in ('date_from', 'date_to'):
+        if params.get(key):
+            try:
+                dates[key] = datetime.strptime(params[key], '%Y-%m-%d')
+            except (TypeError, ValueError):
+                return None, "date_from et date_to doivent être au format AAAA-MM-JJ"
+            scope[key] = params[key]
+    if len(dates) == 2 and dates['date_from'] > dates['date_to']:
+        return None, "date_from doit précéder date_to"
+    
+    return scope, None
+
+def scope_key(scope):
+    """Identifiant d'un périmètre, identique à celui calculé par l'orchestrator."""
+    return hashlib.md5(json.dumps(scope, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+async def refresh_results_cache():
+    """Vide le cache si la génération a changé (appelé sous cache_lock)."""
+    now = time.time()
+    if not results_cache['stale'] and now - results_cache['checked_at'] < CACHE_CHECK_INTERVAL:
+        return
+    
+    generation = await redis_client.get('results_generation')
+    results_cache['checked_at'] = now
+    results_cache['stale'] = False
+    if generation != results_cache['generation']:
+        results_cache['generation'] = generation
+        results_cache['responses'] = {}
+
+async def cached_response(key, build):
+    """Renvoie une réponse JSON pré-rendue pour la génération courante, avec ETag.
+
+    `build` (coroutine) lit dans Redis uniquement les clés nécessaires à la
+    requête ; il n'est appelé qu'une fois par génération et par clé. Un
+    If-None-Match correspondant donne une réponse 304.
+    """
+    async with cache_lock:
+        await refresh_results_cache()
+    generation = results_cache['generation']
+    rendered = results_cache['responses'].get(key)
+    
+    if generation is None:
         return jsonify({"error": "Aucun résultat disponible"}), 404
     
-    results = json.loads(results_json)
-    ca_mensuel = results.get('ca_mensuel_ville', {})
+    if rendered is None:
+        body = app.json.dumps(await build())
+        rendered = (body, hashlib.md5(body.encode('utf-8')).hexdigest())
+        # Une réponse construite pendant un changement de génération n'est pas conservée
+        if results_cache['generation'] == generation:
+            if len(results_cache['responses']) >= MAX_CACHED_RESPONSES:
+                results_cache['responses'] = {}
+            results_cache['responses'][key] = rendered
     
-    # Filtrage par ville si spécifié
+    body, etag = rendered
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return await response.make_conditional(request)
+
+async def listen_for_invalidations():
+    """Marque le cache comme périmé à chaque nouvelle génération de résultats."""
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe('results_updated')
+                async for message in pubsub.listen():
+                    results_cache['stale'] = True
+        except redis.ConnectionError:
+            # Des invalidations ont pu être perdues pendant la déconnexion
+            results_cache['stale'] = True
+            await asyncio.sleep(1)
+
+@app.before_serving
+async def start_invalidation_listener():
+    app.invalidation_listener = asyncio.create_task(listen_for_invalidations())
+
+@app.after_serving
+async def stop_invalidation_listener():
+    app.invalidation_listener.cancel()
+    await redis_pool.disconnect()
+
+async def get_result_cities(ville=None):
+    """Villes concernées par une requête : la ville demandée si elle existe, sinon toutes."""
+    cities = [city.decode('utf-8') for city in await redis_client.lrange('results:villes', 0, -1)]
     if ville:
-        if ville in ca_mensuel:
-            ca_mensuel = {ville: ca_mensuel[ville]}
-        else:
-            ca_mensuel = {}
-    
-    # Filtrage par mois si spécifié
-    if mois:
-        for city, months in ca_mensuel.items():
-            if mois in months:
-                ca_mensuel[city] = {mois: months[mois]}
-            else:
-                ca_mensuel[city] = {}
+        return [ville] if ville in cities else []
+    return cities
+
+async def read_city_hashes(dimension, cities, convert):
+    """Lit en un aller-retour le hash results:<dimension>:<ville> de chaque ville."""
+    pipe = redis_client.pipeline(transaction=False)
+    for city in cities:
+        pipe.hgetall(f"results:{dimension}:{city}")
     
-    return jsonify(ca_mensuel)
+    return {
+        city: {key.decode('utf-8'): convert(value) for key, value in values.items()}
+        for city, values in zip(cities, await pipe.execute())
+    }
 
-@app.route('/api/repartition', methods=['GET'])
-def get_distribution():
-    """API pour obtenir la répartition vente/location par ville."""
-    # Paramètre optionnel
-    ville = request.args.get('ville')
+async def read_job_status(job_id):
+    """Lit en un seul aller-retour le statut, les métriques et la progression d'un job.
+
+    Un job identique à un job déjà en attente partage son exécution
+    (shared_with) : sa progression est celle de ce job. Renvoie None si le
+    job est inconnu.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hmget(f"job:{job_id}", 'status', 'start_time', 'duration', 'error', 'reclaimed_bytes', 'shared_with')
+    pipe.zrank('jobs:pending', job_id)
+    (status, start_time, duration, error, reclaimed_bytes, shared_with), queue_position = await pipe.execute()
+    if not status:
+        return None
     
-    # Récupération des derniers résultats
-    results_json = redis_client.get('latest_results')
+    status = status.decode('utf-8')
+    response = {
+        "job_id": job_id,
+        "status": status,
+        "timestamp": datetime.now().isoformat()
+    }
     
-    if not results_json:
-        return jsonify({"error": "Aucun résultat disponible"}), 404
+    if queue_position is not None:
+        # Nombre de jobs admis avant celui-ci
+        response["queue_position"] = queue_position
     
-    results = json.loads(results_json)
+    executed_job = job_id
+    if shared_with:
+        executed_job = shared_with.decode('utf-8')
+        response["shared_with"] = executed_job
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hget(f"job:{executed_job}", 'tasks_count')
+    pipe.scard(f"job:{executed_job}:completed_tasks")
+    tasks_count, completed_tasks = await pipe.execute()
     
-    # Selon le paramètre "format", renvoyer soit les comptages bruts soit les pourcentages
-    if request.args.get('format') == 'percentage':
-        distribution = results.get('pourcentage_vente_location', {})
-    else:
-        distribution = results.get('repartition_vente_location', {})
+    if start_time:
+        start_time = float(start_time.decode('utf-8'))
+        response["start_time"] = datetime.fromtimestamp(start_time).isoformat()
+        # Calcul du temps écoulé si le job est en cours
+        if status == "running":
+            response["elapsed_time"] = time.time() - start_time
     
-    # Filtrage par ville si spécifié
-    if ville:
-        if ville in distribution:
-            distribution = {ville: distribution[ville]}
-        else:
-            distribution = {}
+    if duration:
+        response["total_duration"] = float(duration.decode('utf-8'))
+    
+    if error:
+        response["error"] = error.decode('utf-8')
+    
+    if reclaimed_bytes:
+        response["reclaimed_bytes"] = int(reclaimed_bytes)
+    
+    if tasks_count:
+        total_tasks = int(tasks_count.decode('utf-8'))
+        response["progress"] = {
+            "completed_tasks": completed_tasks,
+            "total_tasks": total_tasks,
+            "percentage": round((completed_tasks / total_tasks) * 100, 2) if total_tasks > 0 else 0
+        }
     
-    return jsonify(distribution)
+    return response
 
-@app.route('/api/top-modeles', methods=['GET'])
-def get_top_models():
-    """API pour obtenir les modèles les plus populaires par ville."""
-    # Paramètre optionnel
+@app.route('/api/ca-mensuel', methods=['GET'])
+async def get_monthly_revenue():
+    """API pour obtenir le chiffre d'affaires mensuel par ville."""
+    # Paramètres optionnels
     ville = request.args.get('ville')
+    mois = request.args.get('mois')  # Format: YYYY-MM
     
-    # Récupération des derniers résultats
-    results_json = redis_client.get('latest_results')
+    async def build():
+        cities = await get_result_cities(ville)
+        if not mois:
+            return await read_city_hashes('ca_mensuel', cities, float)
+        
+        # Filtrage par mois : un seul champ lu par ville
+        pipe = redis_client.pipeline(transaction=False)
+        for city in cities:
+            pipe.hget(f"results:ca_mensuel:{city}", mois)
+        return {
+            city: ({mois: float(revenue)} if revenue is not None else {})
+            for city, revenue in zip(cities, await pipe.execute())
+        }
     
-    if not results_json:
-        return jsonify({"error": "Aucun résultat disponible"}), 404
+    return await cached_response(('ca-mensuel', ville, mois), build)
+
+@app.route('/api/repartition', methods=['GET'])
+async def get_distribution():
+    """API pour obtenir la répartition vente/location par ville."""
+    # Paramètres optionnels
+    ville = request.args.get('ville')
+    percentage = request.args.get('format') == 'percentage'
     
-    results = json.loads(results_json)
-    top_models = results.get('top_models', {})
+    async def build():
+        # Selon le paramètre "format", renvoyer soit les comptages bruts soit les pourcentages
+        cities = await get_result_cities(ville)
+        if percentage:
+            return await read_city_hashes('pourcentage', cities, float)
+        return await read_city_hashes('repartition', cities, int)
     
-    # Filtrage par ville si spécifié
-    if ville:
-        if ville in top_models:
-            top_models = {ville: top_models[ville]}
-        else:
-            top_models = {}
+    return await cached_response(('repartition', ville, percentage), build)
+
+@app.route('/api/top-modeles', methods=['GET'])
+async def get_top_models():
+    """API pour obtenir les modèles les plus populaires par ville."""
+    # Paramètres optionnels
+    ville = request.args.get('ville')
+    limit = request.args.get('n', TOP_MODELS_LIMIT)
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return jsonify({"error": "Le paramètre n doit être un entier positif"}), 400
     
-    return jsonify(top_models)
+    async def build():
+        # Classement exact : les sorted sets contiennent les comptages complets
+        cities = await get_result_cities(ville)
+        pipe = redis_client.pipeline(transaction=False)
+        for city in cities:
+            pipe.zrevrange(f"results:modeles:{city}", 0, limit - 1, withscores=True)
+        return {
+            city: {model.decode('utf-8'): int(count) for model, count in models}
+            for city, models in zip(cities, await pipe.execute())
+        }
+    
+    return await cached_response(('top-modeles', ville, limit), build)
 
 @app.route('/api/process', methods=['POST'])
-def trigger_processing():
-    """API pour déclencher un nouveau traitement."""
+async def trigger_processing():
+    """API pour déclencher un nouveau traitement.
+
+    Le job est enregistré puis signalé à l'orchestrator en un seul aller-retour,
+    et la réponse 202 est renvoyée immédiatement : la progression se suit via
+    /api/job/<job_id>/status ou le flux /api/job/<job_id>/events.
+    """
     start_time = time.time()
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] === REQUÊTE POST REÇUE SUR /api/process ===")
     
     # Création d'un nouvel ID de job
     job_id = str(uuid.uuid4())
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🆔 Job ID généré: {job_id}")
+    
+    # Paramètres optionnels du corps JSON : traitement complet ou incrémental,
+    # périmètre (villes, type, plage de dates)
+    body = await request.get_json(silent=True)
+    if body is None:
+        body = {}
+    elif not isinstance(body, dict):
+        return jsonify({"error": "Le corps de la requête doit être un objet JSON"}), 400
+    processing_mode = body.get('processing_mode')
+    if processing_mode not in (None, 'full', 'incremental'):
+        return jsonify({"error": "processing_mode doit valoir 'full' ou 'incremental'"}), 400
+    scope, error = parse_scope(body)
+    if error:
+        return jsonify({"error": error}), 400
+    priority = body.get('priority', 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        return jsonify({"error": "priority doit être un entier (les plus élevés sont admis en premier)"}), 400
+    # Profilage des tâches : true pour l'échantillonnage des piles
+    profile = 'sampling' if body.get('profile') is True else body.get('profile') or None
+    if profile not in (None,) + PROFILE_MODES:
+        return jsonify({"error": "profile doit valoir true, 'sampling' ou 'cprofile'"}), 400
     
     try:
-        # Test de connexion Redis
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔍 Test de connexion Redis...")
-        redis_ping = redis_client.ping()
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ Redis ping: {redis_ping}")
-        
-        # Vérification des abonnés au canal
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔍 Vérification des abonnés au canal 'start_processing'...")
-        pubsub_channels = redis_client.pubsub_channels('start_processing')
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📡 Canaux actifs: {pubsub_channels}")
-        
-        pubsub_numsub = redis_client.pubsub_numsub('start_processing')
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 👥 Nombre d'abonnés sur 'start_processing': {pubsub_numsub}")
-        
-        # Nettoyage des anciennes données de job si nécessaire
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🧹 Nettoyage des anciennes données...")
-        
         # Préparation du message
         message_data = {
             'job_id': job_id,
@@ -132,40 +367,32 @@ def trigger_processing():
             'data_path': os.environ.get('DATA_PATH', '/data/transactions_autoconnect.csv'),
             'num_workers': int(os.environ.get('NUM_WORKERS', 3))
         }
-        
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📝 Message à envoyer: {message_data}")
-        
-        # Publication d'un message pour déclencher le traitement dans l'orchestrator
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📤 Envoi du signal de démarrage à l'orchestrator...")
-        
-        num_subscribers = redis_client.publish('start_processing', json.dumps(message_data))
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📊 Signal publié vers {num_subscribers} abonnés")
-        
+        if processing_mode:
+            message_data['processing_mode'] = processing_mode
+        if scope:
+            message_data['scope'] = scope
+        if priority:
+            message_data['priority'] = priority
+        if profile:
+            message_data['profile'] = profile
+        
+        # Enregistrement du job avant la publication : l'orchestrator ne peut
+        # pas passer le statut à "running" avant qu'il ne soit "initiated"
+        pipe = redis_client.pipeline()
+        # Registre des jobs : hash du job et index par heure de début
+        pipe.hset(f"job:{job_id}", mapping={
+            'status': 'initiated',
+            'start_time': start_time,
+            'api_trigger_time': datetime.now().isoformat()
+        })
+        pipe.zadd('jobs:by_start', {job_id: start_time})
+        pipe.zadd('jobs:active', {job_id: start_time})
+        pipe.publish('start_processing', json.dumps(message_data))
+        num_subscribers = (await pipe.execute())[-1]
+        
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📤 Job {job_id} signalé à {num_subscribers} abonné(s) en {time.time() - start_time:.3f}s")
         if num_subscribers == 0:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️  ATTENTION: Aucun abonné trouvé sur le canal 'start_processing'!")
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔍 L'orchestrator n'est peut-être pas démarré ou n'écoute pas le bon canal")
-        
-        # Enregistrement du démarrage du job
-        redis_client.set(f"job:{job_id}:status", "initiated")
-        redis_client.set(f"job:{job_id}:start_time", str(start_time))
-        redis_client.set(f"job:{job_id}:api_trigger_time", datetime.now().isoformat())
-        
-        duration = time.time() - start_time
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ Signal envoyé avec succès en {duration:.3f}s")
-        
-        # Attendre un court instant pour voir si l'orchestrator répond
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏳ Attente de 2 secondes pour vérifier la réception...")
-        time.sleep(2)
-        
-        # Vérifier si le statut a changé
-        updated_status = redis_client.get(f"job:{job_id}:status")
-        if updated_status:
-            updated_status = updated_status.decode('utf-8')
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📊 Statut après 2s: {updated_status}")
-            if updated_status == "running":
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🎉 L'orchestrator a bien reçu le signal!")
-            elif updated_status == "initiated":
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️  L'orchestrator n'a pas encore traité le signal")
         
         return jsonify({
             "status": "processing_started",
@@ -173,7 +400,11 @@ def trigger_processing():
             "message": "Le traitement a été déclenché avec succès",
             "timestamp": datetime.now().isoformat(),
             "subscribers_notified": num_subscribers,
-            "orchestrator_listening": num_subscribers > 0
+            "orchestrator_listening": num_subscribers > 0,
+            "status_url": f"/api/job/{job_id}/status",
+            "events_url": f"/api/job/{job_id}/events",
+            **({"scope": scope, "scope_id": scope_key(scope)} if scope else {}),
+            **({"profile_url": f"/api/job/{job_id}/profile"} if profile else {})
         }), 202
         
     except Exception as e:
@@ -187,141 +418,580 @@ def trigger_processing():
         }), 500
 
 @app.route('/api/job/<job_id>/status', methods=['GET'])
-def get_job_status(job_id):
+async def get_job_status(job_id):
     """API pour obtenir le statut et les métriques d'un job."""
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Demande de statut pour job_id: {job_id}")
-    
     try:
-        # Récupération du statut
-        status = redis_client.get(f"job:{job_id}:status")
-        if not status:
+        response = await read_job_status(job_id)
+        if response is None:
             return jsonify({"error": "Job non trouvé"}), 404
         
-        status = status.decode('utf-8')
-        
-        # Récupération des métriques temporelles
-        start_time = redis_client.get(f"job:{job_id}:start_time")
-        duration = redis_client.get(f"job:{job_id}:duration")
-        error = redis_client.get(f"job:{job_id}:error")
-        
-        # Calcul du temps écoulé si le job est en cours
-        elapsed_time = None
-        if start_time and status == "running":
-            elapsed_time = time.time() - float(start_time.decode('utf-8'))
-        
-        # Progression des tâches
-        tasks_count = redis_client.get(f"job:{job_id}:tasks_count")
-        completed_tasks = redis_client.scard(f"job:{job_id}:completed_tasks")
-        
-        response = {
-            "job_id": job_id,
-            "status": status,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        if start_time:
-            response["start_time"] = datetime.fromtimestamp(float(start_time.decode('utf-8'))).isoformat()
-        
-        if duration:
-            response["total_duration"] = float(duration.decode('utf-8'))
-        
-        if elapsed_time:
-            response["elapsed_time"] = elapsed_time
-        
-        if error:
-            response["error"] = error.decode('utf-8')
-        
-        if tasks_count:
-            response["progress"] = {
-                "completed_tasks": completed_tasks,
-                "total_tasks": int(tasks_count.decode('utf-8')),
-                "percentage": round((completed_tasks / int(tasks_count.decode('utf-8'))) * 100, 2) if int(tasks_count.decode('utf-8')) > 0 else 0
-            }
-        
         return jsonify(response)
         
     except Exception as e:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Erreur lors de la récupération du statut: {str(e)}")
         return jsonify({"error": f"Erreur: {str(e)}"}), 500
 
-@app.route('/api/jobs', methods=['GET'])
-def get_recent_jobs():
-    """API pour obtenir la liste des jobs récents."""
-    try:
-        # Recherche des jobs dans Redis (pattern matching)
-        job_keys = redis_client.keys("job:*:status")
-        jobs = []
-        
-        for key in job_keys:
-            job_id = key.decode('utf-8').split(':')[1]
-            status = redis_client.get(key).decode('utf-8')
+@app.route('/api/job/<job_id>/events', methods=['GET'])
+async def stream_job_events(job_id):
+    """Flux Server-Sent Events du statut d'un job.
+
+    Un événement est émis à chaque changement de statut ou de progression ;
+    le flux se termine quand le job est terminé ou en échec.
+    """
+    if await read_job_status(job_id) is None:
+        return jsonify({"error": "Job non trouvé"}), 404
+    
+    async def events():
+        last_state = None
+        while True:
+            status = await read_job_status(job_id)
+            if status is None:
+                break
             
-            start_time = redis_client.get(f"job:{job_id}:start_time")
-            duration = redis_client.get(f"job:{job_id}:duration")
+            state = (status['status'], json.dumps(status.get('progress')))
+            if state != last_state:
+                last_state = state
+                yield f"event: status\ndata: {json.dumps(status)}\n\n".encode('utf-8')
             
-            job_info = {
-                "job_id": job_id,
-                "status": status
+            if status['status'] in TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(JOB_EVENTS_INTERVAL)
+    
+    response = await make_response(events(), 200, {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Le flux dure autant que le job
+    response.timeout = None
+    return response
+
+@app.route('/api/job/<job_id>/results', methods=['GET'])
+async def get_job_results(job_id):
+    """API pour obtenir les résultats d'un job, provisoires tant qu'il est en cours.
+
+    Les résultats d'un job dont l'exécution a été partagée sont ceux du job exécuté.
+    """
+    shared_with = await redis_client.hget(f"job:{job_id}", 'shared_with')
+    executed_job = shared_with.decode('utf-8') if shared_with else job_id
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(f"job:{executed_job}:aggregated_results")
+    pipe.get(f"job:{executed_job}:partial_results")
+    results_json, partial_json = await pipe.execute()
+    if results_json:
+        return jsonify({
+            "job_id": job_id,
+            "provisional": False,
+            "results": json.loads(results_json)
+        })
+    
+    # Résultats partiels publiés par l'aggregator au fil de l'eau
+    if not partial_json:
+        return jsonify({"error": "Aucun résultat disponible pour ce job"}), 404
+    
+    partial = json.loads(partial_json)
+    return jsonify({
+        "job_id": job_id,
+        "provisional": True,
+        "completed_tasks": partial['completed_tasks'],
+        "total_tasks": partial['total_tasks'],
+        "updated_at": partial['updated_at'],
+        "results": partial['results']
+    })
+
+def percentile(values, q):
+    """Percentile `q` (0-100) d'une liste triée, par le rang le plus proche."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+def flatten_phases(phases):
+    """Aplatit les phases d'un span : les réducteurs deviennent reducer:<nom>."""
+    flat = {name: value for name, value in phases.items() if name != 'reducers'}
+    flat.update({f"reducer:{name}": value for name, value in phases.get('reducers', {}).items()})
+    return flat
+
+def build_timeline(job, queued_at, spans):
+    """Construit la timeline d'un job à partir des spans des tâches.
+
+    Les instants sont relatifs au début de l'orchestration (secondes). Le
+    résumé donne le temps total de chaque phase, la part de la lecture et de
+    la sérialisation face au calcul, les tâches retardataires et l'activité
+    de chaque worker.
+    """
+    origin = float(job.get('orchestration_start') or job.get('start_time') or 0)
+    
+    def offset(timestamp):
+        return round(timestamp - origin, 4) if timestamp is not None else None
+    
+    tasks = []
+    for task_id, span in spans.items():
+        queued = queued_at.get(task_id)
+        picked = span.get('picked_at') or span['started_at']
+        tasks.append({
+            'task_id': task_id,
+            'worker_id': span['worker_id'],
+            'rows': span['rows'],
+            'payload_bytes': span['payload_bytes'],
+            'queued_at': offset(queued),
+            'picked_at': offset(picked),
+            'ended_at': offset(span['ended_at']),
+            'queue_wait': round(picked - queued, 4) if queued is not None else None,
+            'duration': round(span['ended_at'] - span['started_at'], 4),
+            'phases': span['phases']
+        })
+    tasks.sort(key=lambda task: (task['picked_at'], task['task_id']))
+    
+    phase_totals = {}
+    for task in tasks:
+        for name, value in flatten_phases(task['phases']).items():
+            phase_totals[name] = phase_totals.get(name, 0.0) + value
+    io_seconds = sum(value for name, value in phase_totals.items() if name in IO_PHASES)
+    compute_seconds = sum(phase_totals.values()) - io_seconds
+    
+    durations = sorted(task['duration'] for task in tasks)
+    waits = sorted(task['queue_wait'] for task in tasks if task['queue_wait'] is not None)
+    median = percentile(durations, 50)
+    stragglers = sorted((task for task in tasks if median and task['duration'] > STRAGGLER_FACTOR * median),
+                        key=lambda task: -task['duration'])
+    
+    workers = {}
+    for task in tasks:
+        worker = workers.setdefault(task['worker_id'], {'tasks': 0, 'rows': 0, 'busy_seconds': 0.0})
+        worker['tasks'] += 1
+        worker['rows'] += task['rows']
+        worker['busy_seconds'] += task['duration']
+    for worker in workers.values():
+        worker['rows_per_second'] = round(worker['rows'] / worker['busy_seconds'], 1) if worker['busy_seconds'] > 0 else None
+        worker['busy_seconds'] = round(worker['busy_seconds'], 4)
+    
+    aggregator = json.loads(job['aggregator_span']) if job.get('aggregator_span') else None
+    if aggregator:
+        for key in ('started_at', 'last_result_at', 'ended_at'):
+            if key in aggregator:
+                aggregator[key] = offset(aggregator[key])
+    
+    return {
+        'orchestrator': {
+            'step_times': json.loads(job.get('step_times') or '{}'),
+            'completion_time': offset(float(job['completion_time'])) if job.get('completion_time') else None
+        },
+        'aggregator': aggregator,
+        'summary': {
+            'tasks_count': int(job['tasks_count']) if job.get('tasks_count') else None,
+            'tasks_traced': len(tasks),
+            'cache_hits': int(job.get('cache_hits') or 0),
+            'phase_seconds': {name: round(value, 4) for name, value in sorted(phase_totals.items(), key=lambda item: -item[1])},
+            'io_serialization_seconds': round(io_seconds, 4),
+            'compute_seconds': round(compute_seconds, 4),
+            'dominant': 'io_serialization' if io_seconds > compute_seconds else 'compute',
+            'task_duration': {'p50': median, 'p95': percentile(durations, 95), 'max': durations[-1] if durations else None},
+            'queue_wait': {'p50': percentile(waits, 50), 'p95': percentile(waits, 95), 'max': waits[-1] if waits else None},
+            'stragglers': [{key: task[key] for key in ('task_id', 'worker_id', 'rows', 'duration', 'picked_at')} for task in stragglers]
+        },
+        'workers': workers,
+        'tasks': tasks
+    }
+
+@app.route('/api/job/<job_id>/timeline', methods=['GET'])
+async def get_job_timeline(job_id):
+    """API pour obtenir la timeline d'un job : spans des tâches, de l'orchestrator et de l'aggregator.
+
+    Chaque tâche traitée par un worker a un span (mise en file, prise,
+    lecture, décodage, résumé, chaque réducteur, sérialisation, écriture) ;
+    les tâches servies par le cache des chunks n'en ont pas. La timeline
+    d'un job dont l'exécution a été partagée est celle du job exécuté.
+    """
+    shared_with = await redis_client.hget(f"job:{job_id}", 'shared_with')
+    executed_job = shared_with.decode('utf-8') if shared_with else job_id
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(f"job:{executed_job}")
+    pipe.hgetall(f"job:{executed_job}:queued_at")
+    pipe.hgetall(f"job:{executed_job}:spans")
+    job, queued_at, spans = await pipe.execute()
+    if not job:
+        return jsonify({"error": "Job non trouvé"}), 404
+    
+    job = {key.decode('utf-8'): value.decode('utf-8') for key, value in job.items()}
+    timeline = build_timeline(
+        job,
+        {task_id.decode('utf-8'): float(value) for task_id, value in queued_at.items()},
+        {task_id.decode('utf-8'): json.loads(span) for task_id, span in spans.items()}
+    )
+    return jsonify({"job_id": job_id, "executed_job": executed_job, "status": job.get('status'), **timeline})
+
+class MarshalledProfile:
+    """Profil cProfile sérialisé (marshal), chargeable par pstats sans fichier."""
+    
+    def __init__(self, data):
+        self.stats = marshal.loads(data)
+    
+    def create_stats(self):
+        pass
+
+def merge_pstats(profiles, sort, limit):
+    """Fusionne les statistiques cProfile des workers : (texte de print_stats, fichier pstats fusionné).
+
+    Les profils sont chargés en mémoire : l'en-tête du texte ne liste donc
+    aucun fichier.
+    """
+    text = io.StringIO()
+    stats = pstats.Stats(stream=text)
+    stats.add(*(MarshalledProfile(data) for data in profiles))
+    stats.sort_stats(sort).print_stats(limit)
+    return text.getvalue(), marshal.dumps(stats.stats)
+
+@app.route('/api/job/<job_id>/profile', methods=['GET'])
+async def get_job_profile(job_id):
+    """API pour obtenir le profil des tâches d'un job lancé avec `profile`.
+
+    Échantillonnage : piles au format replié (`format=collapsed`, défaut),
+    directement utilisable par flamegraph.pl ou speedscope, ou résumé JSON
+    (`format=json` : piles et fonctions les plus échantillonnées).
+    cProfile : statistiques fusionnées de tous les workers, en texte
+    (`format=text`, défaut, trié par `sort`) ou en fichier pstats
+    (`format=pstats`, à ouvrir avec pstats ou snakeviz).
+    """
+    shared_with = await redis_client.hget(f"job:{job_id}", 'shared_with')
+    executed_job = shared_with.decode('utf-8') if shared_with else job_id
+    status, mode = await redis_client.hmget(f"job:{executed_job}", 'status', 'profile')
+    if not status:
+        return jsonify({"error": "Job non trouvé"}), 404
+    if not mode:
+        return jsonify({"error": "Profilage non activé pour ce job", "hint": "Lancer le job avec {\"profile\": true} via POST /api/process"}), 404
+    
+    mode = mode.decode('utf-8')
+    try:
+        limit = int(request.args.get('limit', PROFILE_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit doit être un entier"}), 400
+    
+    if mode == 'cprofile':
+        output = request.args.get('format', 'text')
+        if output not in ('text', 'pstats'):
+            return jsonify({"error": "format doit valoir 'text' ou 'pstats' pour un profil cProfile"}), 400
+        profiles = await redis_client.hvals(f"job:{executed_job}:profile_stats")
+        if not profiles:
+            return jsonify({"error": "Aucun profil disponible pour ce job"}), 404
+        
+        # Fusion hors de la boucle asyncio (fichiers temporaires, calcul)
+        try:
+            text, merged = await asyncio.to_thread(merge_pstats, profiles, request.args.get('sort', 'cumulative'), limit)
+        except KeyError:
+            return jsonify({"error": "Tri inconnu (exemples : cumulative, tottime, ncalls)"}), 400
+        if output == 'pstats':
+            return merged, 200, {
+                'Content-Type': 'application/octet-stream',
+                'Content-Disposition': f'attachment; filename="{executed_job}.pstats"'
             }
-            
-            if start_time:
-                job_info["start_time"] = datetime.fromtimestamp(float(start_time.decode('utf-8'))).isoformat()
-            
-            if duration:
-                job_info["duration"] = float(duration.decode('utf-8'))
-            
-            jobs.append(job_info)
+        return text, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    output = request.args.get('format', 'collapsed')
+    if output not in ('collapsed', 'json'):
+        return jsonify({"error": "format doit valoir 'collapsed' ou 'json' pour un profil échantillonné"}), 400
+    stacks = await redis_client.hgetall(f"job:{executed_job}:profile_stacks")
+    if not stacks:
+        return jsonify({"error": "Aucun profil disponible pour ce job"}), 404
+    
+    stacks = sorted(((stack.decode('utf-8'), int(count)) for stack, count in stacks.items()), key=lambda item: -item[1])
+    if output == 'collapsed':
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    total = sum(count for _, count in stacks)
+    leaves = {}
+    for stack, count in stacks:
+        leaf = stack.rsplit(';', 1)[-1]
+        leaves[leaf] = leaves.get(leaf, 0) + count
+    return jsonify({
+        "job_id": job_id,
+        "executed_job": executed_job,
+        "status": status.decode('utf-8'),
+        "mode": mode,
+        "samples": total,
+        "top_functions": [{"function": leaf, "samples": count, "share": round(count / total, 4)}
+                          for leaf, count in sorted(leaves.items(), key=lambda item: -item[1])[:limit]],
+        "top_stacks": [{"stack": stack, "samples": count, "share": round(count / total, 4)} for stack, count in stacks[:limit]]
+    })
+
+@app.route('/api/results', methods=['GET'])
+async def get_scoped_results():
+    """API pour obtenir les derniers résultats calculés pour un périmètre.
+
+    Paramètres : `villes` (séparées par des virgules), `type`, `date_from`,
+    `date_to`. Les résultats d'un périmètre sont ceux du dernier job lancé
+    avec les mêmes filtres ; sans filtre, ce sont les résultats publiés.
+    """
+    scope, error = parse_scope(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    if not scope:
+        results_json = await redis_client.get('latest_results')
+        if not results_json:
+            return jsonify({"error": "Aucun résultat disponible"}), 404
+        return jsonify({"scope": {}, "results": json.loads(results_json)})
+    
+    scope_id = scope_key(scope)
+    job_id, updated_at, results_json = await redis_client.hmget(f"results:scope:{scope_id}", 'job_id', 'updated_at', 'results')
+    if not results_json:
+        return jsonify({
+            "error": "Aucun résultat pour ce périmètre",
+            "scope": scope,
+            "hint": "Lancer un job avec ces filtres via POST /api/process"
+        }), 404
+    
+    return jsonify({
+        "scope": scope,
+        "scope_id": scope_id,
+        "job_id": job_id.decode('utf-8'),
+        "updated_at": updated_at.decode('utf-8'),
+        "results": json.loads(results_json)
+    })
+
+async def read_registry_jobs(index_key, offset, limit):
+    """Lit une page du registre des jobs, du plus récent au plus ancien.
+
+    L'index (sorted set par heure de début) donne les identifiants en
+    O(log n + N), puis les hash des N jobs sont lus en un seul pipeline.
+    Renvoie (jobs, nombre total de jobs dans l'index).
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrevrange(index_key, offset, offset + limit - 1)
+    pipe.zcard(index_key)
+    job_ids, total = await pipe.execute()
+    
+    pipe = redis_client.pipeline(transaction=False)
+    for job_id in job_ids:
+        pipe.hgetall(b"job:" + job_id)
+    
+    jobs = []
+    for job_id, fields in zip(job_ids, await pipe.execute()):
+        fields = {key.decode('utf-8'): value.decode('utf-8') for key, value in fields.items()}
+        job_info = {
+            "job_id": job_id.decode('utf-8'),
+            "status": fields.get('status', 'unknown')
+        }
+        
+        if 'start_time' in fields:
+            job_info["start_time"] = datetime.fromtimestamp(float(fields['start_time'])).isoformat()
+        
+        if 'duration' in fields:
+            job_info["duration"] = float(fields['duration'])
         
-        # Trier par heure de début (plus récent en premier)
-        jobs.sort(key=lambda x: x.get('start_time', ''), reverse=True)
+        if 'error' in fields:
+            job_info["error"] = fields['error']
         
-        return jsonify({"jobs": jobs[:10]})  # Limite aux 10 derniers jobs
+        jobs.append(job_info)
+    
+    return jobs, total
+
+@app.route('/api/jobs', methods=['GET'])
+async def get_recent_jobs():
+    """API pour obtenir la liste paginée des jobs récents (plus récent en premier).
+
+    Paramètres optionnels : `limit` (défaut 10, max 100), `offset`, et
+    `status=active` pour ne lister que les jobs non terminés.
+    """
+    try:
+        limit = int(request.args.get('limit', JOBS_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        limit = offset = -1
+    if limit < 1 or offset < 0:
+        return jsonify({"error": "Les paramètres limit et offset doivent être des entiers positifs"}), 400
+    limit = min(limit, MAX_JOBS_PAGE_SIZE)
+    
+    index_key = 'jobs:active' if request.args.get('status') == 'active' else 'jobs:by_start'
+    
+    try:
+        jobs, total = await read_registry_jobs(index_key, offset, limit)
+        
+        response = {"jobs": jobs, "total": total, "offset": offset, "limit": limit}
+        if offset + len(jobs) < total:
+            response["next_offset"] = offset + len(jobs)
+        return jsonify(response)
         
     except Exception as e:
         return jsonify({"error": f"Erreur: {str(e)}"}), 500
 
 @app.route('/api/villes', methods=['GET'])
-def get_cities():
+async def get_cities():
     """API pour obtenir la liste des villes présentes dans les données."""
-    # Récupération des derniers résultats
-    results_json = redis_client.get('latest_results')
+    async def build():
+        return {"villes": await get_result_cities()}
     
-    if not results_json:
-        return jsonify({"error": "Aucun résultat disponible"}), 404
+    return await cached_response(('villes',), build)
+
+@app.before_request
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+async def observe_request_latency(response):
+    """Enregistre la latence de la requête dans l'histogramme en mémoire (sans accès à Redis)."""
+    start = getattr(g, 'request_start', None)
+    if start is not None:
+        duration = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        series = request_latency.setdefault((request.method, route, str(response.status_code)), {
+            'buckets': [0] * (len(REQUEST_LATENCY_BUCKETS) + 1),
+            'sum': 0.0,
+            'count': 0
+        })
+        series['buckets'][next((i for i, bound in enumerate(REQUEST_LATENCY_BUCKETS) if duration <= bound), -1)] += 1
+        series['sum'] += duration
+        series['count'] += 1
+    return response
+
+def format_labels(labels):
+    """Étiquettes au format d'exposition Prometheus : {cle="valeur",...}."""
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+def render_metric(lines, name, metric_type, help_text, samples):
+    """Ajoute une métrique (gauge ou counter) et ses échantillons [(étiquettes, valeur)]."""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels)} {value}")
+
+def render_histogram(lines, name, help_text, series):
+    """Ajoute un histogramme ; `series` : [(étiquettes, [(borne, compteur non cumulé)], somme, nombre)]."""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, buckets, total, count in series:
+        cumulative = 0
+        for bound, value in buckets:
+            cumulative += value
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {total}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+def redis_histogram(fields):
+    """Lit un histogramme écrit par observe_histogram (workers, orchestrator) : (intervalles, somme, nombre).
+
+    Les bornes sont celles enregistrées par le service qui l'alimente (champ
+    `bounds`) : toutes sont exposées, même vides.
+    """
+    fields = {key.decode('utf-8'): value for key, value in fields.items()}
+    bounds = set(fields.pop('bounds', b'').decode('utf-8').split(',')) - {''}
+    bounds |= {key for key in fields if key not in ('sum', 'count', '+Inf')}
+    buckets = [(bound, int(fields.get(bound, 0))) for bound in sorted(bounds, key=float)] + [('+Inf', int(fields.get('+Inf', 0)))]
+    return buckets, float(fields.get('sum', 0)), int(fields.get('count', 0))
+
+@app.route('/metrics', methods=['GET'])
+async def get_metrics():
+    """Métriques au format d'exposition Prometheus.
+
+    Files d'attente, tâches en cours, workers vivants et leur débit, durées
+    des tâches et des jobs (histogrammes alimentés par les workers et
+    l'orchestrator dans leurs pipelines existants), latences des requêtes de
+    l'API et mémoire Redis. Deux allers-retours Redis par collecte.
+    """
+    now = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.llen('task_queue')
+    pipe.zrange('jobs:active', 0, -1)
+    pipe.zcard('jobs:pending')
+    pipe.zcard('task_leases')
+    pipe.zrangebyscore('workers:heartbeat', now - WORKER_TTL, '+inf')
+    pipe.hgetall('metrics:task_duration')
+    for status in TERMINAL_STATUSES:
+        pipe.hgetall(f"metrics:job_duration:{status}")
+    (queue_length, active_jobs, pending_jobs, in_flight, workers, task_duration,
+     *job_durations) = await pipe.execute()
     
-    results = json.loads(results_json)
-    cities = list(results.get('ca_mensuel_ville', {}).keys())
+    # Tâches en attente dans les files des jobs et compteurs des workers vivants
+    pipe = redis_client.pipeline(transaction=False)
+    for job_id in active_jobs:
+        pipe.llen(f"task_queue:{job_id.decode('utf-8')}")
+    if workers:
+        pipe.hmget('workers:throughput', workers)
+        pipe.hmget('workers:tasks_processed', workers)
+        pipe.hmget('workers:rows_processed', workers)
+    counts = await pipe.execute()
+    job_queues_length = sum(counts[:len(active_jobs)])
+    throughput, tasks_processed, rows_processed = counts[len(active_jobs):] or ([], [], [])
     
-    return jsonify({"villes": cities})
+    lines = []
+    render_metric(lines, 'autoconnect_task_queue_length', 'gauge', "Tâches dans task_queue, en attente d'un worker",
+                  [({}, queue_length)])
+    render_metric(lines, 'autoconnect_job_queues_length', 'gauge', "Tâches dans les files des jobs, pas encore envoyées dans task_queue",
+                  [({}, job_queues_length)])
+    render_metric(lines, 'autoconnect_tasks_in_flight', 'gauge', "Tâches prises par un worker (sous bail)", [({}, in_flight)])
+    render_metric(lines, 'autoconnect_jobs_active', 'gauge', "Jobs non terminés", [({}, len(active_jobs))])
+    render_metric(lines, 'autoconnect_jobs_pending', 'gauge', "Jobs en attente d'admission", [({}, pending_jobs)])
+    render_metric(lines, 'autoconnect_workers_alive', 'gauge', "Workers avec un battement récent", [({}, len(workers))])
+    
+    worker_ids = [worker.decode('utf-8') for worker in workers]
+    render_metric(lines, 'autoconnect_worker_rows_per_second', 'gauge', "Débit de la dernière tâche de chaque worker vivant (lignes/s)",
+                  [({'worker': worker}, float(value)) for worker, value in zip(worker_ids, throughput) if value is not None])
+    render_metric(lines, 'autoconnect_worker_tasks_processed_total', 'counter', "Tâches traitées par chaque worker vivant",
+                  [({'worker': worker}, int(value)) for worker, value in zip(worker_ids, tasks_processed) if value is not None])
+    render_metric(lines, 'autoconnect_worker_rows_processed_total', 'counter', "Lignes traitées par chaque worker vivant",
+                  [({'worker': worker}, int(value)) for worker, value in zip(worker_ids, rows_processed) if value is not None])
+    
+    render_histogram(lines, 'autoconnect_task_duration_seconds', "Durée de traitement des tâches par les workers",
+                     [({}, *redis_histogram(task_duration))] if task_duration else [])
+    render_histogram(lines, 'autoconnect_job_duration_seconds', "Durée des jobs terminés, par statut",
+                     [({'status': status}, *redis_histogram(fields)) for status, fields in zip(TERMINAL_STATUSES, job_durations) if fields])
+    
+    bounds = [str(bound) for bound in REQUEST_LATENCY_BUCKETS] + ['+Inf']
+    render_histogram(lines, 'autoconnect_api_request_duration_seconds', "Latence des requêtes servies par ce processus de l'API", [
+        ({'method': method, 'route': route, 'status': status}, list(zip(bounds, series['buckets'])), series['sum'], series['count'])
+        for (method, route, status), series in sorted(request_latency.items())
+    ])
+    
+    try:
+        memory = await redis_client.info('memory')
+    except redis.ResponseError:
+        # Redis sans INFO (serveur de test) : métrique omise
+        memory = None
+    if memory:
+        render_metric(lines, 'autoconnect_redis_used_memory_bytes', 'gauge', "Mémoire utilisée par Redis", [({}, memory['used_memory'])])
+        render_metric(lines, 'autoconnect_redis_used_memory_peak_bytes', 'gauge', "Pic de mémoire utilisée par Redis", [({}, memory['used_memory_peak'])])
+    
+    return '\n'.join(lines) + '\n', 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
 
 @app.route('/api/debug/redis', methods=['GET'])
-def debug_redis():
+async def debug_redis():
     """Endpoint de debug pour vérifier l'état de Redis."""
     try:
+        redis_info = await redis_client.info()
+        
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.ping()
+        pipe.pubsub_channels()
+        pipe.pubsub_numsub('start_processing')
+        redis_ping, pubsub_channels, numsub = await pipe.execute()
+        
+        # Jobs actifs lus depuis le registre, sans parcourir l'espace de clés
+        active_jobs, _ = await read_registry_jobs('jobs:active', 0, MAX_JOBS_PAGE_SIZE)
+        
         info = {
-            "redis_ping": redis_client.ping(),
+            "redis_ping": redis_ping,
             "redis_info": {
-                "connected_clients": redis_client.info()['connected_clients'],
-                "used_memory_human": redis_client.info()['used_memory_human'],
-                "uptime_in_seconds": redis_client.info()['uptime_in_seconds']
+                "connected_clients": redis_info['connected_clients'],
+                "used_memory_human": redis_info['used_memory_human'],
+                "uptime_in_seconds": redis_info['uptime_in_seconds']
             },
-            "pubsub_channels": redis_client.pubsub_channels(),
-            "start_processing_subscribers": redis_client.pubsub_numsub('start_processing')[0][1] if redis_client.pubsub_numsub('start_processing') else 0,
-            "active_jobs": []
+            "pubsub_channels": [channel.decode('utf-8') for channel in pubsub_channels],
+            "start_processing_subscribers": numsub[0][1] if numsub else 0,
+            "active_jobs": [{"job_id": job["job_id"], "status": job["status"]} for job in active_jobs]
         }
         
-        # Recherche des jobs actifs
-        job_keys = redis_client.keys("job:*:status")
-        for key in job_keys:
-            job_id = key.decode('utf-8').split(':')[1]
-            status = redis_client.get(key).decode('utf-8')
-            if status in ['initiated', 'running']:
-                info["active_jobs"].append({"job_id": job_id, "status": status})
-        
         return jsonify(info)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Serveur ASGI : toutes les requêtes sont servies par une boucle asyncio
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    
+    config = Config()
+    config.bind = ['0.0.0.0:5000']
+    asyncio.run(serve(app, config))
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""Test de charge de l'API : latences p50/p99 et requêtes/s par endpoint.
+
+À lancer contre une API démarrée (docker-compose up) ayant déjà des résultats.
+
+Usage : python benchmarks/bench_api_load.py [url_de_base] [requêtes_par_scénario] [concurrence]
+"""
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+SCENARIOS = [
+    ('GET', '/api/villes'),
+    ('GET', '/api/ca-mensuel?ville=Paris&mois=2023-01'),
+    ('GET', '/api/top-modeles?ville=Paris'),
+    ('GET', '/api/job/{job_id}/status'),
+    ('POST', '/api/process')
+]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_scenario(host, port, method, path, num_requests, concurrency):
+    """Envoie num_requests requêtes réparties sur `concurrency` connexions persistantes."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    remaining = [num_requests]
+    
+    def client():
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    break
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                connection.request(method, path)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=30)
+                status = str(e)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if status not in (200, 202, 304):
+                    errors.append(status)
+        connection.close()
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    
+    return latencies, errors, duration
+
+def main():
+    base_url = urlparse(sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:5000')
+    num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    
+    # Un job existant sert de cible à l'endpoint de statut
+    connection = http.client.HTTPConnection(base_url.hostname, base_url.port or 80, timeout=30)
+    connection.request('POST', '/api/process')
+    job_id = json.loads(connection.getresponse().read())['job_id']
+    connection.close()
+    
+    print(f"{num_requests} requêtes par scénario, {concurrency} clients concurrents")
+    print(f"{'endpoint':<45} {'p50 (ms)':>9} {'p99 (ms)':>9} {'req/s':>8} {'erreurs':>8}")
+    for method, path in SCENARIOS:
+        path = path.format(job_id=job_id)
+        # Chaque POST déclenche un job complet : on en limite le nombre
+        count = min(num_requests, 50) if method == 'POST' else num_requests
+        latencies, errors, duration = run_scenario(base_url.hostname, base_url.port or 80, method, path, count, concurrency)
+        print(f"{method + ' ' + path[:40]:<45} {statistics.median(latencies) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f} {len(latencies) / duration:>8.0f} {len(errors):>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""Benchmark de bout en bout : orchestrator -> workers -> aggregator sur des données synthétiques.
+
+Les services tournent chacun dans leur processus, comme dans docker-compose,
+contre un Redis local : fakeredis joignable en TCP (défaut), un redis-server
+lancé pour l'occasion, ou un serveur existant. Chaque exécution enregistre en
+JSON les temps par étape, le débit (lignes/s) et le pic de mémoire (RSS) de
+chaque service, pour comparer deux versions du code :
+
+    python benchmarks/bench_pipeline.py --rows 1e6 --output avant.json
+    python benchmarks/bench_pipeline.py --rows 1e6 --output apres.json
+    python benchmarks/bench_pipeline.py --compare avant.json apres.json
+
+Le fichier de données est généré une fois par jeu de paramètres (--data-dir)
+puis réutilisé. Le cache des chunks est désactivé (CHUNK_CACHE=0) pour que
+les exécutions successives soient comparables. Les services tournent en
+ingestion par plages d'octets (INGESTION_MODE=reference) : les données ne
+passent pas par Redis et le benchmark reste utilisable de 10^5 à 10^8 lignes.
+--env permet de modifier leur configuration (INGESTION_MODE=memory,
+TASK_FORMAT=arrow...) ; les modes memory et streaming transportent les
+chunks dans Redis, et fakeredis refuse les valeurs de plus de 10 Mo environ
+(en JSON, quelques dizaines de milliers de lignes par tâche) : au-delà,
+utiliser --redis redis-server ou borner BATCH_ROWS.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import redis
+
+from common import ROOT_DIR, spawn_service, start_redis_stand_in, write_synthetic_csv
+
+def dataset_path(args):
+    """Chemin du fichier de données d'un jeu de paramètres (réutilisé d'une exécution à l'autre)."""
+    name = f"transactions_{int(args.rows)}_c{args.cities or 'def'}_m{args.models or 'def'}_s{args.skew:g}_seed{args.seed}.csv"
+    return os.path.join(args.data_dir, name)
+
+def prepare_dataset(args):
+    """Génère le fichier de données s'il n'existe pas encore ; renvoie sa description."""
+    path = dataset_path(args)
+    generation_seconds = None
+    if not os.path.exists(path):
+        os.makedirs(args.data_dir, exist_ok=True)
+        print(f"Génération de {int(args.rows):,} lignes dans {path}...", file=sys.stderr)
+        start = time.perf_counter()
+        # Écriture dans un fichier temporaire : une génération interrompue n'est pas réutilisée
+        write_synthetic_csv(path + '.tmp', int(args.rows), args.seed, args.cities, args.models, args.skew)
+        os.replace(path + '.tmp', path)
+        generation_seconds = time.perf_counter() - start
+    
+    return {
+        'path': path,
+        'rows': int(args.rows),
+        'bytes': os.path.getsize(path),
+        'cities': args.cities,
+        'models': args.models,
+        'skew': args.skew,
+        'seed': args.seed,
+        'generation_seconds': generation_seconds
+    }
+
+def start_redis(mode):
+    """Démarre ou désigne le Redis du benchmark ; renvoie (processus éventuel, base vidable)."""
+    if mode == 'fakeredis':
+        server = start_redis_stand_in()
+        # Connexions coupées à l'arrêt des services : pas de trace d'erreur dans la sortie
+        server.handle_error = lambda request, client_address: None
+        return None, True
+    
+    os.environ['REDIS_HOST'] = '127.0.0.1' if mode == 'redis-server' else mode
+    process = None
+    if mode == 'redis-server':
+        if not shutil.which('redis-server'):
+            sys.exit("redis-server introuvable dans le PATH")
+        process = subprocess.Popen(['redis-server', '--port', '6379', '--save', '', '--appendonly', 'no'],
+                                   stdout=subprocess.DEVNULL)
+    
+    client = redis.Redis(host=os.environ['REDIS_HOST'], port=6379)
+    wait_for(lambda: ping(client), 10, "Redis injoignable")
+    # Un serveur existant n'est jamais vidé
+    return process, mode == 'redis-server'
+
+def ping(client):
+    try:
+        return client.ping()
+    except redis.ConnectionError:
+        return False
+
+def wait_for(predicate, timeout, error):
+    """Attend que `predicate` soit vrai, ou interrompt le benchmark après `timeout` secondes."""
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise TimeoutError(error)
+        time.sleep(0.02)
+
+def peak_rss_mb(pid):
+    """Pic de mémoire résidente (VmHWM) d'un processus et de ses descendants, en Mo (Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except (OSError, StopIteration):
+        return None
+    
+    return peak_kb / 1024 + sum(peak_rss_mb(child) or 0 for child in children)
+
+def trigger_job(client, job_id):
+    """Déclenche un job comme le fait POST /api/process (enregistrement puis publication)."""
+    start_time = time.time()
+    pipe = client.pipeline()
+    pipe.hset(f"job:{job_id}", mapping={
+        'status': 'initiated',
+        'start_time': start_time,
+        'api_trigger_time': datetime.now().isoformat()
+    })
+    pipe.zadd('jobs:by_start', {job_id: start_time})
+    pipe.zadd('jobs:active', {job_id: start_time})
+    pipe.publish('start_processing', json.dumps({
+        'job_id': job_id,
+        'timestamp': datetime.now().isoformat(),
+        'triggered_by': 'benchmark',
+        'processing_mode': 'full'
+    }))
+    pipe.execute()
+    return start_time
+
+def run_job(client, timeout):
+    """Exécute un job de bout en bout et renvoie ses mesures."""
+    job_id = f"bench-{uuid.uuid4()}"
+    start = trigger_job(client, job_id)
+    
+    def finished():
+        status = client.hget(f"job:{job_id}", 'status')
+        return status == b'failed' or (status == b'completed' and client.exists(f"job:{job_id}:aggregated_results"))
+    
+    wait_for(finished, timeout, f"Job {job_id} non terminé après {timeout}s")
+    end = time.time()
+    
+    fields = {key.decode('utf-8'): value.decode('utf-8') for key, value in client.hgetall(f"job:{job_id}").items()}
+    if fields['status'] == 'failed':
+        raise RuntimeError(f"Job {job_id} en échec: {fields.get('error')}")
+    
+    metrics = json.loads(fields.get('performance_metrics', '{}'))
+    stages = json.loads(fields.get('step_times', '{}'))
+    # Attente dans l'ordonnanceur, puis agrégation après la dernière tâche
+    stages['admission'] = float(fields['orchestration_start']) - start
+    aggregated_at = client.zscore('results:history', job_id)
+    if aggregated_at and 'completion_time' in fields:
+        stages['aggregation'] = max(0.0, aggregated_at - float(fields['completion_time']))
+    
+    rows = metrics.get('total_rows', 0)
+    return {
+        'job_id': job_id,
+        'end_to_end_seconds': end - start,
+        'rows': rows,
+        'rows_per_second': rows / (end - start),
+        'stages': stages,
+        'performance_metrics': metrics
+    }
+
+def redis_memory(client):
+    """Mémoire utilisée par Redis (None pour fakeredis, qui n'implémente pas INFO)."""
+    try:
+        info = client.info('memory')
+    except redis.ResponseError:
+        return None
+    return {'used_memory_mb': info['used_memory'] / 1024 / 1024,
+            'used_memory_peak_mb': info['used_memory_peak'] / 1024 / 1024}
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def summarize(runs):
+    """Médianes des exécutions : durée, débit et temps de chaque étape."""
+    stage_names = sorted({name for run in runs for name in run['stages']})
+    return {
+        'end_to_end_seconds': statistics.median(run['end_to_end_seconds'] for run in runs),
+        'rows_per_second': statistics.median(run['rows_per_second'] for run in runs),
+        'stages': {name: statistics.median(run['stages'][name] for run in runs if name in run['stages'])
+                   for name in stage_names}
+    }
+
+def run_benchmark(args):
+    dataset = prepare_dataset(args)
+    redis_process, flushable = start_redis(args.redis)
+    client = redis.Redis(host=os.environ['REDIS_HOST'], port=6379)
+    if flushable:
+        client.flushdb()
+    
+    env = {
+        'DATA_PATH': dataset['path'],
+        'NUM_WORKERS': str(args.workers),
+        # Les workers lisent le fichier : aucune donnée ne transite par Redis,
+        # quelle que soit la taille du jeu (--env INGESTION_MODE=memory pour la remplacer)
+        'INGESTION_MODE': 'reference',
+        'CHUNK_CACHE': '0',
+        'PYTHONUNBUFFERED': '1'
+    }
+    env.update(dict(item.split('=', 1) for item in args.env))
+    
+    log_file = open(args.log, 'w') if args.log else subprocess.DEVNULL
+    services = {'orchestrator': spawn_service('orchestrator', env, log_file),
+                'aggregator': spawn_service('aggregator', env, log_file)}
+    for i in range(args.workers):
+        services[f"worker{i}"] = spawn_service('worker', {**env, 'WORKER_ID': f"bench-worker{i}"}, log_file)
+    
+    try:
+        # Services prêts : orchestrator abonné, workers inscrits
+        wait_for(lambda: client.pubsub_numsub('start_processing')[0][1] > 0, 30, "Orchestrator non démarré")
+        wait_for(lambda: client.zcard('workers:heartbeat') >= args.workers, 30, "Workers non démarrés")
+        
+        runs = []
+        for index in range(args.warmup + args.runs):
+            run = run_job(client, args.timeout)
+            label = 'échauffement' if index < args.warmup else f"exécution {index - args.warmup + 1}/{args.runs}"
+            print(f"{label}: {run['end_to_end_seconds']:.2f}s - {run['rows_per_second']:,.0f} lignes/s", file=sys.stderr)
+            if index >= args.warmup:
+                runs.append(run)
+        
+        peak_rss = {name: peak_rss_mb(process.pid) for name, process in services.items()}
+        # Processus du benchmark, qui héberge aussi le Redis simulé
+        peak_rss['harness'] = peak_rss_mb(os.getpid())
+        memory = redis_memory(client)
+    finally:
+        for process in services.values():
+            process.terminate()
+        for process in services.values():
+            process.wait()
+        if redis_process:
+            redis_process.terminate()
+    
+    return {
+        'benchmark': 'pipeline',
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': git_revision(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+        'dataset': dataset,
+        'config': {'workers': args.workers, 'redis': args.redis, 'env': env},
+        'runs': runs,
+        'summary': summarize(runs),
+        'peak_rss_mb': peak_rss,
+        'redis_memory': memory
+    }
+
+def format_value(value):
+    return '-' if value is None else f"{value:.4g}"
+
+def compare(before_path, after_path):
+    """Affiche côte à côte les médianes de deux fichiers de résultats."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    
+    def rows(report):
+        summary = report['summary']
+        values = {'bout en bout (s)': summary['end_to_end_seconds'], 'lignes/s': summary['rows_per_second']}
+        values.update({f"étape {name} (s)": value for name, value in summary['stages'].items()})
+        values.update({f"RSS max {name} (Mo)": value for name, value in report['peak_rss_mb'].items() if value})
+        return values
+    
+    before_rows, after_rows = rows(before), rows(after)
+    print(f"{'mesure':<40} {'avant':>12} {'après':>12} {'rapport':>8}")
+    for name in list(before_rows) + [name for name in after_rows if name not in before_rows]:
+        old, new = before_rows.get(name), after_rows.get(name)
+        ratio = f"x{new / old:.2f}" if old and new is not None else ''
+        print(f"{name:<40} {format_value(old):>12} {format_value(new):>12} {ratio:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=float, default=1e6, help="nombre de lignes générées (défaut : 1e6)")
+    parser.add_argument('--cities', type=int, default=None, help="nombre de villes (défaut : 3)")
+    parser.add_argument('--models', type=int, default=None, help="nombre de modèles (défaut : 6)")
+    parser.add_argument('--skew', type=float, default=0.0, help="exposant de Zipf des villes et modèles (0 : uniforme)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=3, help="nombre de processus worker")
+    parser.add_argument('--runs', type=int, default=3, help="exécutions mesurées (médiane)")
+    parser.add_argument('--warmup', type=int, default=1, help="exécutions d'échauffement non mesurées")
+    parser.add_argument('--redis', default='fakeredis', help="fakeredis, redis-server ou hôte d'un Redis existant (port 6379)")
+    parser.add_argument('--env', action='append', default=[], metavar='CLÉ=VALEUR', help="variable d'environnement des services")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'autoconnect-bench'))
+    parser.add_argument('--timeout', type=float, default=3600, help="durée maximale d'un job (s)")
+    parser.add_argument('--log', help="fichier recevant les logs des services")
+    parser.add_argument('--output', help="fichier JSON de résultats (défaut : sortie standard)")
+    parser.add_argument('--compare', nargs=2, metavar=('AVANT', 'APRÈS'), help="compare deux fichiers de résultats")
+    args = parser.parse_args()
+    
+    if args.compare:
+        compare(*args.compare)
+        return
+    
+    report = run_benchmark(args)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Résultats écrits dans {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Compare les réducteurs du worker : version iterrows historique vs version vectorisée.
+
+Usage : python benchmarks/bench_reducers.py [nombre_de_lignes]
+"""
+import math
+import sys
+import time
+
+import pandas as pd
+
+from common import load_service, synthetic_transactions
+
+worker = load_service('worker')
+
+# --- Implémentation historique (avant vectorisation), conservée pour comparaison ---
+
+def legacy_process_monthly_revenue_by_city(df):
+    """Calcule le chiffre d'affaires mensuel par ville."""
+    # Convertir les dates en format datetime
+    df['date'] = pd.to_datetime(df['date'])
+    
+    # Créer une colonne année-mois
+    df['month'] = df['date'].dt.strftime('%Y-%m')
+    
+    # Calcul du CA mensuel par ville
+    result = df.groupby(['ville', 'month'], observed=True)['prix'].sum().reset_index()
+    
+    # Transformation en format dictionnaire
+    monthly_revenue = {}
+    for _, row in result.iterrows():
+        city = row['ville']
+        month = row['month']
+        revenue = float(row['prix'])
+        
+        if city not in monthly_revenue:
+            monthly_revenue[city] = {}
+        
+        monthly_revenue[city][month] = revenue
+    
+    return monthly_revenue
+
+def legacy_calculate_sales_rental_distribution(df):
+    """Calcule la répartition vente/location par ville."""
+    # Comptage des transactions par ville et type
+    result = df.groupby(['ville', 'type'], observed=True).size().reset_index(name='count')
+    
+    # Transformation en format dictionnaire
+    distribution = {}
+    for _, row in result.iterrows():
+        city = row['ville']
+        transaction_type = row['type']
+        count = int(row['count'])
+        
+        if city not in distribution:
+            distribution[city] = {}
+        
+        distribution[city][transaction_type] = count
+    
+    return distribution
+
+def legacy_find_top_models(df):
+    """Détermine les 5 modèles les plus populaires par ville."""
+    # Comptage des modèles par ville
+    result = df.groupby(['ville', 'modele'], observed=True).size().reset_index(name='count')
+    
+    # Tri et sélection des top 5
+    top_models = {}
+    for city in result['ville'].unique():
+        city_data = result[result['ville'] == city]
+        top_5 = city_data.sort_values('count', ascending=False).head(5)
+        
+        top_models[city] = {}
+        for _, row in top_5.iterrows():
+            top_models[city][row['modele']] = int(row['count'])
+    
+    return top_models
+
+def legacy_results(df):
+    df = df.copy()
+    return {
+        'ca_mensuel_ville': legacy_process_monthly_revenue_by_city(df),
+        'repartition_vente_location': legacy_calculate_sales_rental_distribution(df),
+        'top_models': legacy_find_top_models(df)
+    }
+
+def vectorized_results(df):
+    summary = worker.summarize_chunk(df)
+    return {
+        'ca_mensuel_ville': worker.process_monthly_revenue_by_city(summary),
+        'repartition_vente_location': worker.calculate_sales_rental_distribution(summary),
+        'model_counts': worker.count_models_by_city(summary)
+    }
+
+def assert_equivalent(expected, actual):
+    """Vérifie que les deux implémentations produisent les mêmes résultats."""
+    assert expected['repartition_vente_location'] == actual['repartition_vente_location']
+    assert expected['ca_mensuel_ville'].keys() == actual['ca_mensuel_ville'].keys()
+    for city, months in expected['ca_mensuel_ville'].items():
+        assert months.keys() == actual['ca_mensuel_ville'][city].keys()
+        for month, revenue in months.items():
+            assert math.isclose(revenue, actual['ca_mensuel_ville'][city][month], rel_tol=1e-9)
+    for city, models in expected['top_models'].items():
+        top_counts = sorted(actual['model_counts'][city].values(), reverse=True)[:len(models)]
+        assert sorted(models.values(), reverse=True) == top_counts
+
+def timed(func, df, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    df = synthetic_transactions(num_rows)
+    
+    # Colonnes texte (payload JSON / CSV) puis colonnes typées (payload Arrow)
+    typed = df.assign(date=pd.to_datetime(df['date']), ville=df['ville'].astype('category'),
+                      type=df['type'].astype('category'), modele=df['modele'].astype('category'))
+    
+    print(f"{'données':>10} {'historique (s)':>15} {'vectorisé (s)':>14} {'gain':>6}")
+    for label, frame in (('texte', df), ('typées', typed)):
+        legacy_time, expected = timed(legacy_results, frame)
+        vectorized_time, actual = timed(vectorized_results, frame)
+        assert_equivalent(expected, actual)
+        print(f"{label:>10} {legacy_time:>15.3f} {vectorized_time:>14.3f} {legacy_time / vectorized_time:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Mesure l'effet d'un worker ralenti sur la durée des jobs : découpage fixe vs adaptatif.
+
+Le pipeline complet tourne sur un Redis simulé (fakeredis en TCP), avec
+l'orchestrator dans ce processus et chaque worker dans son propre processus.
+Un des workers est ralenti d'un facteur donné.
+
+Usage : python benchmarks/bench_stragglers.py [nombre_de_lignes] [facteur_de_ralentissement]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import load_service, spawn_service, start_redis_stand_in, synthetic_transactions
+
+NUM_WORKERS = 3
+RUNS = 5
+
+def run_slow_worker(slow_factor):
+    """Point d'entrée d'un worker dont le calcul est ralenti d'un facteur donné."""
+    worker = load_service('worker')
+    summarize_chunk = worker.summarize_chunk
+    
+    def slow_summarize_chunk(df):
+        start = time.perf_counter()
+        summary = summarize_chunk(df)
+        time.sleep((slow_factor - 1) * (time.perf_counter() - start))
+        return summary
+    
+    worker.summarize_chunk = slow_summarize_chunk
+    worker.main()
+
+def run_job(orchestrator, client, job_id):
+    start = time.perf_counter()
+    orchestrator.run_orchestration(job_id)
+    while not client.exists(f"job:{job_id}:aggregated_results"):
+        time.sleep(0.005)
+    return time.perf_counter() - start
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    slow_factor = float(sys.argv[2]) if len(sys.argv) > 2 else 4.0
+    
+    start_redis_stand_in()
+    processes = []
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = os.path.join(tmp_dir, 'transactions.csv')
+        synthetic_transactions(num_rows).to_csv(data_path, index=False)
+        os.environ.update({'DATA_PATH': data_path, 'NUM_WORKERS': str(NUM_WORKERS),
+                           'INGESTION_MODE': 'memory', 'TASK_FORMAT': 'arrow'})
+        
+        try:
+            processes.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), '--slow-worker', str(slow_factor)],
+                                              env={**os.environ, 'WORKER_ID': 'worker0'}, stdout=subprocess.DEVNULL))
+            for i in range(1, NUM_WORKERS):
+                processes.append(spawn_service('worker', {'WORKER_ID': f"worker{i}"}))
+            processes.append(spawn_service('aggregator'))
+            
+            orchestrator = load_service('orchestrator')
+            time.sleep(1)
+            
+            # Silence les logs de l'orchestrator pendant les mesures
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, 'w')
+            try:
+                durations = {}
+                for task_sizing in ('fixed', 'adaptive'):
+                    os.environ['TASK_SIZING'] = task_sizing
+                    # Un premier job alimente les mesures de débit des workers
+                    run_job(orchestrator, orchestrator.redis_client, f"warmup-{task_sizing}")
+                    durations[task_sizing] = [run_job(orchestrator, orchestrator.redis_client, f"{task_sizing}-{run}")
+                                              for run in range(RUNS)]
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+    
+    print(f"{num_rows} lignes, {NUM_WORKERS} workers dont 1 ralenti x{slow_factor:g}, {RUNS} jobs par mode")
+    print(f"{'découpage':>10} {'médiane (s)':>12} {'max (s)':>9}")
+    for task_sizing, values in durations.items():
+        print(f"{task_sizing:>10} {statistics.median(values):>12.3f} {max(values):>9.3f}")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--slow-worker']:
+        run_slow_worker(float(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,71 @@
+"""Temps de distribution de N tâches : SET + LPUSH par tâche vs pipelines par lots.
+
+Redis (fakeredis) est joint en TCP à travers un relais qui ajoute une latence
+réseau (aller-retour de `rtt_ms`), comme depuis le conteneur orchestrator :
+chaque commande non pipelinée coûte un aller-retour. Les payloads sont encodés
+une fois au préalable (temps affiché à part) pour ne mesurer que l'envoi à Redis.
+
+Usage : python benchmarks/bench_task_distribution.py [nombre_de_tâches] [lignes_par_tâche] [rtt_ms]
+"""
+import os
+import sys
+import time
+
+from common import load_service, start_latency_proxy, start_redis_stand_in, synthetic_transactions
+
+def distribute_one_by_one(orchestrator, chunks, job_id):
+    """Distribution historique : deux allers-retours par tâche."""
+    client = orchestrator.redis_client
+    for i, chunk in enumerate(chunks):
+        task_id = f"task:{job_id}:{i}"
+        client.set(task_id, orchestrator.encode_chunk(chunk))
+        client.lpush('task_queue', task_id)
+    client.set(f"job:{job_id}:tasks_count", len(chunks))
+
+def measure(distribute, orchestrator, chunks, job_id):
+    client = orchestrator.redis_client
+    start = time.perf_counter()
+    distribute(chunks, job_id)
+    duration = time.perf_counter() - start
+    
+    # Tâches en attente dans la file commune ou dans celle du job
+    queued = client.llen('task_queue') + client.llen(orchestrator.job_queue_key(job_id))
+    client.flushdb()
+    return duration, queued
+
+def main():
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rows_per_task = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rtt_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    
+    # Les services se connectent au port 6379 : le relais y écoute
+    start_redis_stand_in(port=6380)
+    start_latency_proxy(6379, 6380, rtt_ms / 1000)
+    orchestrator = load_service('orchestrator')
+    data = synthetic_transactions(num_tasks * rows_per_task)
+    chunks = [data.iloc[i:i + rows_per_task] for i in range(0, len(data), rows_per_task)]
+    
+    # Encodage identique pour les deux variantes : il est fait une seule fois
+    start = time.perf_counter()
+    payloads = {id(chunk): orchestrator.encode_chunk(chunk) for chunk in chunks}
+    encoding = time.perf_counter() - start
+    orchestrator.encode_chunk = lambda chunk, task_format=None: payloads[id(chunk)]
+    
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        legacy = measure(lambda c, j: distribute_one_by_one(orchestrator, c, j), orchestrator, chunks, 'bench-legacy')
+        batched = measure(orchestrator.distribute_tasks, orchestrator, chunks, 'bench-batched')
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    
+    print(f"{num_tasks} tâches de {rows_per_task} lignes (format {orchestrator.TASK_FORMAT}, lots de {orchestrator.DISTRIBUTION_BATCH_SIZE}, aller-retour réseau {rtt_ms} ms)")
+    print(f"Encodage des payloads (hors mesure) : {encoding:.2f}s")
+    print(f"{'distribution':<22} {'durée (s)':>10} {'tâches/s':>10} {'en file':>8}")
+    for name, (duration, queued) in [('SET + LPUSH par tâche', legacy), ('pipelines par lots', batched)]:
+        print(f"{name:<22} {duration:>10.2f} {num_tasks / duration:>10.0f} {queued:>8}")
+    print(f"Accélération : x{legacy[0] / batched[0]:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Compare les payloads de tâches JSON records et Arrow IPC.
+
+Usage : python benchmarks/bench_task_format.py [nombre_de_lignes ...]
+"""
+import sys
+import time
+
+from common import load_service, synthetic_transactions
+
+orchestrator = load_service('orchestrator')
+worker = load_service('worker')
+
+def best_of(func, repeat=5):
+    """Retourne le meilleur temps d'exécution (s) et le dernier résultat."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    
+    print(f"{'lignes':>10} {'format':>6} {'octets':>12} {'encodage (s)':>13} {'décodage (s)':>13}")
+    for num_rows in sizes:
+        chunk = synthetic_transactions(num_rows)
+        for task_format in ('json', 'arrow'):
+            encode_time, payload = best_of(lambda: orchestrator.encode_chunk(chunk, task_format))
+            if isinstance(payload, str):
+                payload = payload.encode('utf-8')
+            decode_time, df = best_of(lambda: worker.decode_payload(payload))
+            assert len(df) == num_rows
+            print(f"{num_rows:>10} {task_format:>6} {len(payload):>12,} {encode_time:>13.4f} {decode_time:>13.4f}")
+
+if __name__ == "__main__":
+    main()
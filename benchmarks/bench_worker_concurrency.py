@@ -0,0 +1,76 @@
+"""Débit d'un conteneur worker selon WORKER_CONCURRENCY (1 à N processus).
+
+Les tâches sont des descripteurs de plages d'octets (mode référence) sur un
+CSV synthétique : Redis (fakeredis en TCP) ne transporte pas les données et
+le débit mesuré est celui du calcul.
+
+Usage : python benchmarks/bench_worker_concurrency.py [nombre_de_lignes] [processus_max]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from common import load_service, spawn_service, start_redis_stand_in, synthetic_transactions
+
+ROWS_PER_TASK = 50000
+
+def run(orchestrator, data_path, concurrency, run_id):
+    client = orchestrator.redis_client
+    job_id = f"bench-{run_id}"
+    bytes_per_row = orchestrator.estimate_row_count(data_path)[1]
+    columns, ranges = orchestrator.compute_byte_ranges(data_path, 1, int(ROWS_PER_TASK * bytes_per_row))
+    
+    worker = spawn_service('worker', {'WORKER_CONCURRENCY': str(concurrency), 'WORKER_ID': f"bench-{run_id}"})
+    try:
+        # Attend que tous les processus soient prêts avant de publier les tâches
+        while client.zcount('workers:heartbeat', time.time() - 5, '+inf') < concurrency:
+            time.sleep(0.05)
+        
+        # Comme run_orchestration : les tâches du job sont placées dans sa file
+        # task_queue:<job_id>, que le thread d'alimentation verse dans task_queue
+        orchestrator.running_jobs[job_id] = time.time()
+        orchestrator.start_task_feeder()
+        start = time.perf_counter()
+        orchestrator.distribute_ranges(data_path, columns, ranges, job_id)
+        while client.scard(f"job:{job_id}:completed_tasks") < len(ranges):
+            time.sleep(0.01)
+        duration = time.perf_counter() - start
+    finally:
+        orchestrator.running_jobs.pop(job_id, None)
+        worker.terminate()
+        worker.wait()
+    
+    client.delete('workers:heartbeat')
+    return len(ranges), duration
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    max_processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    
+    start_redis_stand_in()
+    # Chaque mesure porte sur les mêmes plages : le cache des chunks les servirait sans calcul
+    os.environ['CHUNK_CACHE'] = '0'
+    orchestrator = load_service('orchestrator')
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = os.path.join(tmp_dir, 'transactions.csv')
+        synthetic_transactions(num_rows).to_csv(data_path, index=False)
+        
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            measures = [(concurrency, *run(orchestrator, data_path, concurrency, concurrency))
+                        for concurrency in range(1, max_processes + 1)]
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    
+    baseline = measures[0][2]
+    print(f"{num_rows} lignes en tâches de {ROWS_PER_TASK} lignes")
+    print(f"{'processus':>9} {'tâches':>7} {'durée (s)':>10} {'lignes/s':>12} {'accélération':>13}")
+    for concurrency, num_tasks, duration in measures:
+        print(f"{concurrency:>9} {num_tasks:>7} {duration:>10.2f} {num_rows / duration:>12,.0f} {baseline / duration:>12.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Utilitaires partagés par les scripts de benchmark."""
+import importlib.util
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CITIES = ['Paris', 'Lyon', 'Marseille']
+MODELS = ['Peugeot 208', 'Renault Clio', 'Tesla Model 3', 'BMW X3', 'Audi A4', 'Mercedes C Class']
+
+# Valeurs supplémentaires pour les jeux de données à forte cardinalité
+EXTRA_CITIES = ['Toulouse', 'Nice', 'Nantes', 'Montpellier', 'Strasbourg', 'Bordeaux', 'Lille', 'Rennes',
+                'Reims', 'Toulon', 'Saint-Étienne', 'Le Havre', 'Grenoble', 'Dijon', 'Angers', 'Nîmes']
+EXTRA_MODELS = ['Renault Megane', 'Peugeot 3008', 'Citroen C3', 'Volkswagen Golf', 'Toyota Yaris',
+                'Dacia Sandero', 'Renault Captur', 'Peugeot 2008', 'Kia Niro', 'Hyundai Tucson']
+
+# Dates possibles des transactions (libellés précalculés)
+DATE_LABELS = pd.date_range('2023-01-01', periods=425, freq='D').strftime('%Y-%m-%d').to_numpy()
+
+# Lignes générées et écrites par lot : la mémoire reste bornée jusqu'à 10^8 lignes et plus
+GENERATION_CHUNK_ROWS = 1_000_000
+
+def load_service(name, alias=None):
+    """Importe le main.py d'un service (orchestrator, worker...) sous un nom unique.
+
+    Un alias distinct permet de charger plusieurs instances indépendantes d'un
+    même service (plusieurs workers dans un seul processus, par exemple).
+    """
+    module_name = f"{alias or name}_main"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT_DIR, name, 'main.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def start_redis_stand_in(port=6379):
+    """Démarre un Redis simulé (fakeredis) joignable en TCP, dans un thread.
+
+    Les services se connectent au port 6379 : ils peuvent donc tourner dans
+    des processus séparés, comme dans docker-compose.
+    """
+    from fakeredis import TcpFakeServer
+    
+    server = TcpFakeServer(('127.0.0.1', port))
+    # Les threads de connexion ne doivent pas empêcher le benchmark de se terminer
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['REDIS_HOST'] = '127.0.0.1'
+    return server
+
+def start_latency_proxy(listen_port, target_port, rtt):
+    """Relaie les connexions TCP de listen_port vers target_port avec un aller-retour de `rtt` secondes.
+
+    Chaque paquet est transmis rtt/2 après sa réception, sans retarder les
+    paquets suivants : un pipeline ne paie la latence qu'une fois, comme sur
+    un vrai réseau entre conteneurs.
+    """
+    def forward(source, destination):
+        pending = queue.Queue()
+        
+        def send():
+            while True:
+                received_at, data = pending.get()
+                if not data:
+                    break
+                time.sleep(max(0.0, received_at + rtt / 2 - time.perf_counter()))
+                try:
+                    destination.sendall(data)
+                except OSError:
+                    break
+            destination.close()
+        
+        threading.Thread(target=send, daemon=True).start()
+        while True:
+            try:
+                data = source.recv(65536)
+            except OSError:
+                data = b''
+            pending.put((time.perf_counter(), data))
+            if not data:
+                break
+    
+    def accept(listener):
+        while True:
+            client, _ = listener.accept()
+            upstream = socket.create_connection(('127.0.0.1', target_port))
+            for connection in (client, upstream):
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=forward, args=(client, upstream), daemon=True).start()
+            threading.Thread(target=forward, args=(upstream, client), daemon=True).start()
+    
+    listener = socket.create_server(('127.0.0.1', listen_port))
+    threading.Thread(target=accept, args=(listener,), daemon=True).start()
+    return listener
+
+def spawn_service(name, env=None, log_file=subprocess.DEVNULL):
+    """Lance le main.py d'un service dans un processus séparé."""
+    return subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, name, 'main.py')],
+                            env={**os.environ, **(env or {})}, stdout=log_file, stderr=subprocess.STDOUT)
+
+def labels(base, extra, count, prefix):
+    """Liste de `count` libellés : ceux de base, puis des valeurs réalistes, puis des libellés numérotés."""
+    if count is None:
+        return list(base)
+    values = (list(base) + list(extra))[:count]
+    return values + [f"{prefix} {i}" for i in range(len(values) + 1, count + 1)]
+
+def zipf_weights(count, skew):
+    """Probabilités décroissantes en 1/rang^skew (skew=0 : distribution uniforme)."""
+    if not skew:
+        return None
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+def synthetic_transactions(num_rows, seed=42, num_cities=None, num_models=None, skew=0.0, start_id=1, id_width=8):
+    """Génère un DataFrame au format de transactions_autoconnect.csv.
+
+    `num_cities` / `num_models` fixent la cardinalité des villes et des
+    modèles (défaut : CITIES et MODELS) ; `skew` concentre les transactions
+    sur les premières valeurs selon une loi de Zipf. Une même graine donne
+    les mêmes données.
+    """
+    cities = labels(CITIES, EXTRA_CITIES, num_cities, 'Ville')
+    models = labels(MODELS, EXTRA_MODELS, num_models, 'Modèle')
+    
+    rng = np.random.default_rng(seed)
+    types = rng.choice(['vente', 'location'], size=num_rows)
+    is_rental = types == 'location'
+    dates = DATE_LABELS[rng.integers(0, len(DATE_LABELS), size=num_rows)]
+    city_values = rng.choice(cities, size=num_rows, p=zipf_weights(len(cities), skew))
+    model_values = rng.choice(models, size=num_rows, p=zipf_weights(len(models), skew))
+    prices = np.where(is_rental, rng.uniform(300, 1500, size=num_rows), rng.uniform(15000, 80000, size=num_rows)).round(2)
+    durations = pd.array(rng.integers(6, 49, size=num_rows), dtype='Int64')
+    durations[~is_rental] = pd.NA
+    
+    return pd.DataFrame({
+        'transaction_id': 'TX' + pd.Series(np.arange(start_id, start_id + num_rows)).astype(str).str.zfill(id_width),
+        'date': dates,
+        'ville': city_values,
+        'type': types,
+        'modele': model_values,
+        'prix': prices,
+        'duree_location_mois': durations
+    })
+
+def write_synthetic_csv(path, num_rows, seed=42, num_cities=None, num_models=None, skew=0.0):
+    """Écrit un CSV synthétique de num_rows lignes, par lots de GENERATION_CHUNK_ROWS.
+
+    Chaque lot a sa propre graine dérivée de `seed` : le fichier est
+    reproductible et la mémoire utilisée ne dépend pas de sa taille. Les lots
+    sont écrits par le writer CSV d'Arrow, sans guillemets comme le fichier
+    d'origine.
+    """
+    id_width = max(8, len(str(num_rows)))
+    options = pa_csv.WriteOptions(include_header=False, quoting_style='none')
+    with open(path, 'wb') as f:
+        header_written = False
+        for index, start in enumerate(range(0, num_rows, GENERATION_CHUNK_ROWS)):
+            chunk = synthetic_transactions(min(GENERATION_CHUNK_ROWS, num_rows - start), seed=[seed, index],
+                                           num_cities=num_cities, num_models=num_models, skew=skew,
+                                           start_id=start + 1, id_width=id_width)
+            if not header_written:
+                f.write((','.join(chunk.columns) + '\n').encode('utf-8'))
+                header_written = True
+            pa_csv.write_csv(pa.Table.from_pandas(chunk, preserve_index=False), f, options)
@@ -0,0 +1,33 @@
+"""Génère un fichier de transactions synthétiques au format de transactions_autoconnect.csv.
+
+Les données sont reproductibles (graine), de 10^5 à 10^8 lignes et plus, avec
+une cardinalité des villes et des modèles et une asymétrie (loi de Zipf)
+configurables.
+
+Usage : python benchmarks/generate_transactions.py fichier.csv --rows 10000000 --cities 20 --models 50 --skew 1.1
+"""
+import argparse
+import os
+import time
+
+from common import write_synthetic_csv
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help="fichier CSV à écrire")
+    parser.add_argument('--rows', type=float, default=1e6, help="nombre de lignes (défaut : 1e6)")
+    parser.add_argument('--cities', type=int, default=None, help="nombre de villes (défaut : Paris, Lyon, Marseille)")
+    parser.add_argument('--models', type=int, default=None, help="nombre de modèles (défaut : 6)")
+    parser.add_argument('--skew', type=float, default=0.0, help="exposant de Zipf des villes et modèles (0 : uniforme)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    write_synthetic_csv(args.path, int(args.rows), args.seed, args.cities, args.models, args.skew)
+    duration = time.perf_counter() - start
+    
+    size_mb = os.path.getsize(args.path) / 1024 / 1024
+    print(f"{int(args.rows):,} lignes écrites dans {args.path} ({size_mb:.1f} Mo) en {duration:.1f}s - {args.rows / duration:,.0f} lignes/s")
+
+if __name__ == "__main__":
+    main()
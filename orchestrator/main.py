@@ -1,21 +1,240 @@
 import pandas as pd
+import pyarrow.parquet as pq
 import redis
+import glob
+import hashlib
 import json
+import math
+import mmap
 import os
+import io
+import re
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import threading
 
 # Configuration Redis
 redis_client = redis.Redis(host=os.environ.get('REDIS_HOST', 'redis'), port=6379, db=0)
 
-def load_data(filepath):
-    """Charge les données depuis un fichier CSV."""
+# Délai maximal (s) d'une attente bloquante sur les notifications de fin de tâche
+MONITOR_TIMEOUT = int(os.environ.get('MONITOR_TIMEOUT', 5))
+
+# Dimensionnement adaptatif des tâches (TASK_SIZING=adaptive)
+TASKS_PER_WORKER = int(os.environ.get('TASKS_PER_WORKER', 4))
+TARGET_TASK_SECONDS = float(os.environ.get('TARGET_TASK_SECONDS', 2.0))
+MIN_TASK_ROWS = int(os.environ.get('MIN_TASK_ROWS', 1000))
+MAX_TASK_ROWS = int(os.environ.get('MAX_TASK_ROWS', 500000))
+
+# Un worker est considéré vivant si son dernier battement date de moins de WORKER_TTL secondes
+WORKER_TTL = int(os.environ.get('WORKER_TTL', 15))
+
+# Bornes (s) de l'histogramme des durées de job (metrics:job_duration:<statut>),
+# exposé par /metrics de l'API. Seule définition : elles sont enregistrées
+# avec l'histogramme
+JOB_DURATION_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Nombre maximal d'exécutions d'une tâche dont le bail a expiré
+MAX_TASK_ATTEMPTS = int(os.environ.get('MAX_TASK_ATTEMPTS', 3))
+
+# Durée (s) d'un bail de worker (même valeur que les workers) : une tâche
+# restée plus longtemps sans bail dans une file processing:<worker_id> est
+# considérée abandonnée (worker arrêté entre la prise de la tâche et la pose du bail)
+LEASE_TIMEOUT = int(os.environ.get('LEASE_TIMEOUT', 30))
+
+# Tâches vues sans bail dans une file de traitement : élément -> (file, première observation)
+unleased_tasks = {}
+last_orphan_scan = 0.0
+
+# Format des payloads de tâches : 'json' (records) ou 'arrow' (IPC colonnaire)
+TASK_FORMAT = os.environ.get('TASK_FORMAT', 'json')
+
+# Colonnes à faible cardinalité encodées en dictionnaire dans le format Arrow
+CATEGORICAL_COLUMNS = ['ville', 'type', 'modele']
+
+# Colonnes utilisées par les calculs : seules celles-ci sont lues et transmises
+SUMMARY_COLUMNS = ['date', 'ville', 'type', 'modele', 'prix']
+
+# Filtres acceptés pour limiter un job (périmètre) : liste de villes, type de
+# transaction, plage de dates (AAAA-MM-JJ, bornes incluses)
+SCOPE_FILTERS = ('villes', 'type', 'date_from', 'date_to')
+
+# Nombre de tâches envoyées à Redis par pipeline lors de la distribution
+DISTRIBUTION_BATCH_SIZE = int(os.environ.get('DISTRIBUTION_BATCH_SIZE', 100))
+
+# Rétention : les payloads sont supprimés par les workers dès que le résultat
+# est stocké ; TASK_PAYLOAD_TTL (s) borne la durée de vie de ceux d'un job
+# abandonné. JOB_STATE_TTL (s) s'applique à l'état intermédiaire d'un job
+# terminé (0 : conservation indéfinie), et seuls les JOBS_HISTORY_SIZE jobs
+# les plus récents restent dans le registre
+TASK_PAYLOAD_TTL = int(os.environ.get('TASK_PAYLOAD_TTL', 86400))
+JOB_STATE_TTL = int(os.environ.get('JOB_STATE_TTL', 3600))
+JOBS_HISTORY_SIZE = int(os.environ.get('JOBS_HISTORY_SIZE', 1000))
+
+# Traitement 'full' (tout le fichier) ou 'incremental' (seulement les lignes
+# ajoutées depuis le dernier job, à partir du repère stocké dans
+# ingestion:watermark:<fichier>) ; le message de déclenchement peut le préciser
+PROCESSING_MODE = os.environ.get('PROCESSING_MODE', 'full')
+
+# Octets lus en début et en fin de zone déjà traitée pour détecter un fichier réécrit
+FINGERPRINT_BYTES = 65536
+
+# Cache des résultats de chunks, adressé par l'empreinte du contenu : un chunk
+# déjà traité (par n'importe quel job) n'est pas redistribué. Éviction LRU au-delà
+# de CHUNK_CACHE_MAX_ENTRIES entrées ou CHUNK_CACHE_MAX_BYTES octets de résultats.
+# CHUNK_CACHE_VERSION est à incrémenter si le calcul des résultats change
+CHUNK_CACHE = os.environ.get('CHUNK_CACHE', '1') == '1'
+CHUNK_CACHE_MAX_ENTRIES = int(os.environ.get('CHUNK_CACHE_MAX_ENTRIES', 10000))
+CHUNK_CACHE_MAX_BYTES = int(os.environ.get('CHUNK_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+CHUNK_CACHE_VERSION = 1
+
+# Ordonnancement : au plus MAX_CONCURRENT_JOBS jobs orchestrés simultanément ;
+# les autres attendent dans jobs:pending, par priorité décroissante puis par
+# ordre d'arrivée. Un job identique à un job en attente partage son exécution
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 2))
+
+# Écart de score entre deux niveaux de priorité dans jobs:pending (supérieur
+# à toute heure d'arrivée : la priorité l'emporte toujours sur l'ancienneté)
+PRIORITY_STEP = 1e10
+
+# Les tâches d'un job sont placées dans sa file task_queue:<job_id> ; la file
+# commune task_queue, lue par les workers, en est alimentée à tour de rôle et
+# limitée à DISPATCH_WINDOW tâches (0 : deux par worker vivant), pour que
+# les jobs en cours se partagent équitablement les workers
+DISPATCH_WINDOW = int(os.environ.get('DISPATCH_WINDOW', 0))
+FEED_INTERVAL = float(os.environ.get('FEED_INTERVAL', 0.05))
+
+# Jobs en cours d'orchestration dans ce processus, dans l'ordre d'admission
+running_jobs = {}
+
+# Jobs profilés en cours : leurs tâches sont toutes traitées par les workers,
+# sans passer par le cache des chunks
+profiled_jobs = set()
+# Réveille l'alimentation de task_queue dès qu'un job distribue des tâches
+feed_wakeup = threading.Event()
+feeder_started = threading.Lock()
+# Places d'exécution et section critique entre admission et déduplication
+job_slots = threading.BoundedSemaphore(MAX_CONCURRENT_JOBS)
+scheduler_lock = threading.Lock()
+
+# Flux Redis consommé par l'aggregator (les résultats en cache y sont publiés
+# comme ceux des workers)
+RESULTS_STREAM = 'task_results'
+RESULTS_STREAM_MAXLEN = int(os.environ.get('RESULTS_STREAM_MAXLEN', 10000))
+
+# Jeu de données multi-fichiers : DATA_PATH peut désigner un répertoire ou un
+# motif glob de fichiers CSV, CSV compressés (gzip) ou Parquet. Les fichiers
+# sont inspectés par DISCOVERY_THREADS threads et lus directement par les workers
+DATA_FILE_SUFFIXES = ('.csv', '.csv.gz', '.parquet')
+DISCOVERY_THREADS = int(os.environ.get('DISCOVERY_THREADS', 8))
+
+# Dates de partition reconnues dans le nom d'un fichier ou de son répertoire
+# (date=2024-01-15/, ventes_20240115.csv, 2024-01.parquet)
+PARTITION_DAY = re.compile(r'(?<!\d)(\d{4})-?(\d{2})-?(\d{2})(?!\d)')
+PARTITION_MONTH = re.compile(r'(?<!\d)(\d{4})-(\d{2})(?![\d-])')
+# Partition par ville à la manière de Hive (ville=Paris/)
+PARTITION_CITY = re.compile(r'(?:^|/)ville=([^/]+)/')
+
+class ByteRangeReader(io.RawIOBase):
+    """Lecture d'un fichier limitée à la plage [start, end), consommable par pandas."""
+    
+    def __init__(self, f, start, end):
+        f.seek(start)
+        self.f = f
+        self.remaining = end - start
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self.f.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+def read_header(filepath):
+    """Retourne les colonnes du CSV et la position du début des données."""
+    with open(filepath, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+    
+    return list(pd.read_csv(io.BytesIO(header), nrows=0).columns), data_start
+
+def last_line_end(f, size, floor):
+    """Position suivant la dernière fin de ligne du fichier (une ligne en cours d'écriture est exclue)."""
+    position = size
+    while position > floor:
+        block_start = max(floor, position - FINGERPRINT_BYTES)
+        f.seek(block_start)
+        newline = f.read(position - block_start).rfind(b'\n')
+        if newline >= 0:
+            return block_start + newline + 1
+        position = block_start
+    
+    return floor
+
+def fingerprint(f, offset):
+    """Empreinte de la zone [0, offset) : son début et sa fin, pour détecter un fichier réécrit."""
+    digest = hashlib.md5(str(offset).encode('utf-8'))
+    f.seek(0)
+    digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    f.seek(max(0, offset - FINGERPRINT_BYTES))
+    digest.update(f.read(offset - max(0, offset - FINGERPRINT_BYTES)))
+    return digest.hexdigest()
+
+def plan_data_window(filepath, processing_mode):
+    """Détermine la plage d'octets [start, end) à traiter.
+
+    La fin est la dernière ligne complète au moment du lancement : les lignes
+    ajoutées pendant le job seront traitées par le suivant. En mode
+    incrémental, le début est le repère enregistré à la fin du dernier job,
+    si l'empreinte de la zone déjà traitée n'a pas changé ; sinon (fichier
+    tronqué ou réécrit) le fichier est retraité en entier.
+    Renvoie (mode effectif, start, end, empreinte de [0, end)).
+    """
+    _, data_start = read_header(filepath)
+    
+    with open(filepath, 'rb') as f:
+        end = last_line_end(f, os.fstat(f.fileno()).st_size, data_start)
+        start = data_start
+        
+        if processing_mode == 'incremental':
+            watermark = redis_client.hmget(f"ingestion:watermark:{filepath}", 'offset', 'fingerprint')
+            offset = int(watermark[0]) if watermark[0] else None
+            if offset is not None and data_start <= offset <= end and fingerprint(f, offset) == watermark[1].decode('utf-8'):
+                start = offset
+            else:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️  Aucun repère valide pour {filepath} (premier passage ou fichier modifié): traitement complet")
+                processing_mode = 'full'
+        
+        return processing_mode, start, end, fingerprint(f, end)
+
+def encode_chunk(chunk, task_format=TASK_FORMAT):
+    """Sérialise un chunk pour stockage dans Redis."""
+    if task_format == 'arrow':
+        chunk = chunk.reset_index(drop=True)
+        # Types natifs : dates en datetime64, colonnes texte répétitives en dictionnaire
+        chunk['date'] = pd.to_datetime(chunk['date'])
+        for column in CATEGORICAL_COLUMNS:
+            chunk[column] = chunk[column].astype('category')
+        buffer = io.BytesIO()
+        chunk.to_feather(buffer, compression='lz4')
+        return buffer.getvalue()
+    
+    return chunk.to_json(orient='records')
+
+def load_data(filepath, window=None):
+    """Charge les données depuis un fichier CSV, éventuellement limitées à une plage d'octets."""
     start_time = time.time()
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début du chargement des données depuis {filepath}")
     
-    df = pd.read_csv(filepath)
+    if window:
+        columns, _ = read_header(filepath)
+        with open(filepath, 'rb') as f:
+            df = pd.read_csv(io.BufferedReader(ByteRangeReader(f, *window)), header=None, names=columns, usecols=SUMMARY_COLUMNS)
+    else:
+        df = pd.read_csv(filepath, usecols=SUMMARY_COLUMNS)
     
     end_time = time.time()
     duration = end_time - start_time
@@ -23,16 +242,53 @@ def load_data(filepath):
     
     return df
 
-def split_data(df, num_workers):
-    """Divise les données en chunks pour les workers."""
+def normalize_scope(scope):
+    """Forme canonique d'un périmètre : filtres renseignés uniquement, villes triées sans doublon."""
+    scope = {key: (scope or {}).get(key) for key in SCOPE_FILTERS if (scope or {}).get(key)}
+    if 'villes' in scope:
+        scope['villes'] = sorted(set(scope['villes']))
+    return scope
+
+def scope_key(scope):
+    """Identifiant stable d'un périmètre : les jobs aux mêmes filtres partagent leurs résultats."""
+    return hashlib.md5(json.dumps(scope, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+# Copie identique de filter_scope dans worker/main.py (chaque service a sa
+# propre image) : toute modification doit être reportée dans les deux
+def filter_scope(df, scope):
+    """Ne conserve que les transactions du périmètre du job : villes, type, dates (bornes incluses)."""
+    if not scope:
+        return df
+    
+    mask = pd.Series(True, index=df.index)
+    if scope.get('villes'):
+        mask &= df['ville'].isin(scope['villes'])
+    if scope.get('type'):
+        mask &= df['type'] == scope['type']
+    dates = pd.to_datetime(df['date']) if scope.get('date_from') or scope.get('date_to') else None
+    if scope.get('date_from'):
+        mask &= dates >= pd.Timestamp(scope['date_from'])
+    if scope.get('date_to'):
+        mask &= dates < pd.Timestamp(scope['date_to']) + pd.Timedelta(days=1)
+    return df[mask]
+
+def split_data(df, rows_per_task):
+    """Divise les données en chunks de rows_per_task lignes pour les workers.
+
+    Les frontières suivent une grille fixe depuis la première ligne, comme
+    les lots du mode streaming : des lignes ajoutées en fin de fichier ne
+    déplacent pas les chunks précédents (cache des chunks).
+    """
     start_time = time.time()
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début de la division des données en {num_workers} chunks")
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début de la division des données en chunks de {rows_per_task} lignes")
+    
+    if len(df) == 0:
+        return []
     
-    chunk_size = len(df) // num_workers + (1 if len(df) % num_workers > 0 else 0)
     chunks = []
     
-    for i in range(0, len(df), chunk_size):
-        chunk = df.iloc[i:i+chunk_size]
+    for i in range(0, len(df), rows_per_task):
+        chunk = df.iloc[i:i+rows_per_task]
         chunks.append(chunk)
     
     end_time = time.time()
@@ -41,44 +297,663 @@ def split_data(df, num_workers):
     
     return chunks
 
+def get_live_workers():
+    """Retourne les identifiants des workers ayant émis un battement récent."""
+    return [worker_id.decode('utf-8') for worker_id in
+            redis_client.zrangebyscore('workers:heartbeat', time.time() - WORKER_TTL, '+inf')]
+
+def measure_worker_throughput(worker_ids):
+    """Débit moyen (lignes/s) mesuré par les workers vivants sur leurs dernières tâches."""
+    if not worker_ids:
+        return None
+    
+    rates = [float(rate) for rate in redis_client.hmget('workers:throughput', worker_ids) if rate]
+    return sum(rates) / len(rates) if rates else None
+
+def estimate_row_count(filepath, sample_bytes=65536, window=None):
+    """Estime le nombre de lignes et la taille moyenne d'une ligne à partir d'un échantillon."""
+    with open(filepath, 'rb') as f:
+        f.readline()
+        data_bytes = os.fstat(f.fileno()).st_size - f.tell()
+        if window:
+            data_bytes = window[1] - window[0]
+            f.seek(window[0])
+        sample = f.read(min(sample_bytes, data_bytes))
+    
+    bytes_per_row = len(sample) / max(sample.count(b'\n'), 1)
+    return int(data_bytes / bytes_per_row) if bytes_per_row else 0, bytes_per_row
+
+def stable_task_rows(rows_per_task):
+    """Arrondit une taille de tâche à une puissance de deux.
+
+    De légères variations du volume ou du débit mesuré ne déplacent pas les
+    frontières des chunks d'un job à l'autre, ce qui rendrait le cache inutile.
+    """
+    return 2 ** round(math.log2(max(rows_per_task, 1)))
+
+def plan_task_rows(total_rows, num_workers):
+    """Détermine le nombre de lignes par tâche.
+
+    Chaque worker vivant reçoit au moins TASKS_PER_WORKER tâches, et une tâche
+    ne dépasse pas TARGET_TASK_SECONDS au débit mesuré : un worker lent ou
+    redémarré ne retient qu'une petite tâche, et un worker ajouté reçoit du
+    travail sans modifier NUM_WORKERS.
+    """
+    live_workers = get_live_workers()
+    worker_count = len(live_workers) or num_workers
+    
+    rows_per_task = -(-total_rows // (worker_count * TASKS_PER_WORKER))
+    throughput = measure_worker_throughput(live_workers)
+    if throughput:
+        rows_per_task = min(rows_per_task, int(throughput * TARGET_TASK_SECONDS))
+    rows_per_task = max(MIN_TASK_ROWS, min(rows_per_task, MAX_TASK_ROWS))
+    if CHUNK_CACHE:
+        rows_per_task = max(MIN_TASK_ROWS, min(stable_task_rows(rows_per_task), MAX_TASK_ROWS))
+    
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📏 Dimensionnement: {worker_count} workers vivants, débit mesuré: {f'{throughput:.0f} lignes/s' if throughput else 'inconnu'} -> {rows_per_task} lignes par tâche")
+    
+    return rows_per_task, worker_count
+
+def chunk_fingerprint(data, salt=''):
+    """Empreinte du contenu d'un chunk (payload encodé ou plage d'octets du fichier)."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    digest = hashlib.md5(f"{CHUNK_CACHE_VERSION}:{salt}:".encode('utf-8'))
+    digest.update(data)
+    return digest.hexdigest()
+
+def job_queue_key(job_id):
+    """File des tâches d'un job en attente d'envoi dans task_queue."""
+    return f"task_queue:{job_id}"
+
+def record_queued(pipe, job_id, task_ids):
+    """Horodate la mise en file des tâches : début de leur span dans la timeline du job."""
+    if task_ids:
+        pipe.hset(f"job:{job_id}:queued_at", mapping=dict.fromkeys(task_ids, time.time()))
+
+def lookup_chunk_cache(fingerprints, job_id=None):
+    """Cherche en un aller-retour les résultats en cache : (results_json, lignes) ou None par empreinte."""
+    if not CHUNK_CACHE or not fingerprints or job_id in profiled_jobs:
+        return [None] * len(fingerprints)
+    
+    pipe = redis_client.pipeline(transaction=False)
+    for fingerprint in fingerprints:
+        pipe.hmget(f"chunk_cache:{fingerprint}", 'results', 'rows')
+    
+    return [(results, int(rows)) if results is not None else None for results, rows in pipe.execute()]
+
+def complete_from_cache(pipe, job_id, task_id, fingerprint, entry):
+    """Marque une tâche comme terminée avec un résultat en cache, comme le ferait un worker."""
+    results_json, rows = entry
+    pipe.set(f"{task_id}:results", results_json, ex=JOB_STATE_TTL or None)
+    pipe.xadd(RESULTS_STREAM, {'job_id': job_id, 'task_id': task_id, 'results': results_json},
+              maxlen=RESULTS_STREAM_MAXLEN, approximate=True)
+    pipe.hset(f"job:{job_id}:task_rows", task_id, rows)
+    pipe.sadd(f"job:{job_id}:completed_tasks", task_id)
+    pipe.rpush(f"job:{job_id}:completion_events", task_id)
+    pipe.zadd('chunk_cache:lru', {fingerprint: time.time()})
+    pipe.hincrby(f"job:{job_id}", 'cache_hits', 1)
+
+def dispatch_payloads(job_id, tasks):
+    """Met en file des tâches [(task_id, payload)], sauf celles dont le résultat est en cache.
+
+    Un aller-retour pour la recherche dans le cache, un pour l'écriture des
+    payloads et la mise en file (un seul LPUSH). L'empreinte de chaque tâche
+    distribuée est transmise au worker, qui alimente le cache.
+    """
+    fingerprints = [chunk_fingerprint(payload) if CHUNK_CACHE else None for _, payload in tasks]
+    cached = lookup_chunk_cache(fingerprints, job_id)
+    
+    queued = []
+    pipe = redis_client.pipeline(transaction=False)
+    for (task_id, payload), fingerprint, entry in zip(tasks, fingerprints, cached):
+        if entry:
+            complete_from_cache(pipe, job_id, task_id, fingerprint, entry)
+            continue
+        pipe.set(task_id, payload, ex=TASK_PAYLOAD_TTL or None)
+        if fingerprint:
+            pipe.hset(f"job:{job_id}:fingerprints", task_id, fingerprint)
+        queued.append(task_id)
+    if queued:
+        pipe.lpush(job_queue_key(job_id), *queued)
+        record_queued(pipe, job_id, queued)
+    pipe.execute()
+    feed_wakeup.set()
+
+def evict_chunk_cache():
+    """Supprime les entrées les moins récemment utilisées au-delà des limites du cache."""
+    fingerprints = redis_client.zrange('chunk_cache:lru', 0, -1)
+    if not fingerprints:
+        return
+    
+    sizes = [int(size or 0) for size in redis_client.hmget('chunk_cache:sizes', fingerprints)]
+    total_bytes = sum(sizes)
+    evicted = []
+    for fingerprint, size in zip(fingerprints, sizes):
+        if len(fingerprints) - len(evicted) <= CHUNK_CACHE_MAX_ENTRIES and total_bytes <= CHUNK_CACHE_MAX_BYTES:
+            break
+        evicted.append(fingerprint)
+        total_bytes -= size
+    
+    if evicted:
+        pipe = redis_client.pipeline()
+        pipe.delete(*[b"chunk_cache:" + fingerprint for fingerprint in evicted])
+        pipe.zrem('chunk_cache:lru', *evicted)
+        pipe.hdel('chunk_cache:sizes', *evicted)
+        pipe.execute()
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️  Cache des chunks: {len(evicted)} entrée(s) évincée(s), {total_bytes / 1024 / 1024:.1f} Mo conservés")
+
 def distribute_tasks(chunks, job_id):
-    """Distribue les chunks aux workers via Redis."""
+    """Distribue les chunks aux workers via Redis.
+
+    Les payloads sont envoyés par pipelines de DISTRIBUTION_BATCH_SIZE tâches,
+    chaque lot étant mis en file par un seul LPUSH une fois ses payloads écrits ;
+    les chunks dont le résultat est en cache ne sont pas distribués.
+    """
     start_time = time.time()
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début de la distribution des tâches (job_id: {job_id})")
     
     task_ids = []
     
-    for i, chunk in enumerate(chunks):
+    for batch_start in range(0, len(chunks), DISTRIBUTION_BATCH_SIZE):
+        # Sérialisation du lot, puis stockage et publication pour traitement
+        batch = [(f"task:{job_id}:{i}", encode_chunk(chunk))
+                 for i, chunk in enumerate(chunks[batch_start:batch_start + DISTRIBUTION_BATCH_SIZE], start=batch_start)]
+        dispatch_payloads(job_id, batch)
+        task_ids.extend(task_id for task_id, _ in batch)
+    
+    # Stockage du nombre total de tâches pour ce job
+    redis_client.hset(f"job:{job_id}", 'tasks_count', len(task_ids))
+    
+    end_time = time.time()
+    duration = end_time - start_time
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Distribution terminée - {len(task_ids)} tâches créées en {duration:.2f}s")
+    
+    return task_ids
+
+def stream_tasks(filepath, job_id, batch_rows, window=None, scope=None):
+    """Lit le CSV par lots de lignes et distribue chaque lot dès qu'il est parsé.
+
+    Seul le lot courant est gardé en mémoire : la consommation de l'orchestrator
+    reste bornée quelle que soit la taille du fichier, et les workers démarrent
+    pendant que la lecture se poursuit. Seules les colonnes utiles sont lues
+    et les lignes hors du périmètre du job sont écartées avant sérialisation.
+    """
+    start_time = time.time()
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début de l'ingestion en streaming depuis {filepath} (lots de {batch_rows} lignes)")
+    
+    task_ids = []
+    total_rows = 0
+    
+    if window:
+        columns, _ = read_header(filepath)
+        source = open(filepath, 'rb')
+        reader = pd.read_csv(io.BufferedReader(ByteRangeReader(source, *window)), header=None, names=columns,
+                             usecols=SUMMARY_COLUMNS, chunksize=batch_rows)
+    else:
+        source = None
+        reader = pd.read_csv(filepath, usecols=SUMMARY_COLUMNS, chunksize=batch_rows)
+    
+    for chunk in reader:
+        chunk = filter_scope(chunk, scope)
+        if chunk.empty:
+            continue
         task_start = time.time()
-        task_id = f"task:{job_id}:{i}"
-        # Conversion en JSON et stockage dans Redis
-        redis_client.set(task_id, chunk.to_json(orient='records'))
-        # Publication pour traitement
-        redis_client.lpush('task_queue', task_id)
+        task_id = f"task:{job_id}:{len(task_ids)}"
+        # Le lot est mis en file dès qu'il est parsé (sauf résultat en cache)
+        dispatch_payloads(job_id, [(task_id, encode_chunk(chunk))])
         task_ids.append(task_id)
+        total_rows += len(chunk)
         
         task_duration = time.time() - task_start
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Tâche {task_id} distribuée ({len(chunk)} lignes) en {task_duration:.3f}s")
     
-    # Stockage du nombre total de tâches pour ce job
-    redis_client.set(f"job:{job_id}:tasks_count", len(task_ids))
+    if source:
+        source.close()
     
-    end_time = time.time()
-    duration = end_time - start_time
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Distribution terminée - {len(task_ids)} tâches créées en {duration:.2f}s")
+    # Le nombre total de tâches n'est connu qu'en fin de lecture
+    redis_client.hset(f"job:{job_id}", 'tasks_count', len(task_ids))
+    
+    duration = time.time() - start_time
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Ingestion terminée - {total_rows} lignes, {len(task_ids)} tâches créées en {duration:.2f}s")
+    
+    return task_ids, total_rows
+
+def compute_byte_ranges(filepath, num_ranges, range_bytes=None, window=None):
+    """Découpe le CSV (ou la plage d'octets `window`) en plages alignées sur les fins de ligne.
+
+    Seuls quelques octets autour de chaque frontière sont lus : le contenu du
+    fichier n'est ni parsé ni copié. Suppose qu'aucun champ ne contient de
+    retour à la ligne.
+    """
+    with open(filepath, 'rb') as f:
+        header = f.readline()
+        data_start = grid_origin = f.tell()
+        file_size = os.fstat(f.fileno()).st_size
+        if window:
+            data_start, file_size = window
+        
+        if not range_bytes:
+            range_bytes = -(-(file_size - data_start) // max(num_ranges, 1))
+        range_bytes = max(range_bytes, 1)
+        
+        ranges = []
+        start = data_start
+        while start < file_size:
+            # Frontières sur une grille fixe depuis le début des données : un même
+            # contenu donne les mêmes plages d'un job à l'autre (cache des chunks)
+            target = grid_origin + ((start - grid_origin) // range_bytes + 1) * range_bytes
+            if target >= file_size:
+                end = file_size
+            else:
+                # Avance jusqu'au début de la ligne suivante
+                f.seek(target)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    
+    columns = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+    return columns, ranges
+
+def distribute_ranges(filepath, columns, ranges, job_id, scope=None, profile=None):
+    """Distribue des descripteurs de plages d'octets : les workers lisent le fichier partagé.
+
+    Le périmètre du job accompagne chaque descripteur ; il est appliqué par
+    le worker et fait partie de l'empreinte de la plage. Le mode de
+    profilage éventuel du job y figure aussi (hors empreinte).
+    """
+    start_time = time.time()
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début de la distribution de {len(ranges)} plages d'octets (job_id: {job_id})")
+    
+    task_ids = [f"task:{job_id}:{i}" for i in range(len(ranges))]
+    fingerprints = [None] * len(ranges)
+    if CHUNK_CACHE and ranges:
+        # Empreinte de chaque plage lue directement dans le fichier projeté en mémoire
+        with open(filepath, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                salt = ','.join(columns) + (json.dumps(scope, sort_keys=True) if scope else '')
+                fingerprints = [chunk_fingerprint(view[start:end], salt) for start, end in ranges]
+                view.release()
+    cached = lookup_chunk_cache(fingerprints, job_id)
+    
+    descriptors = []
+    queued = []
+    pipe = redis_client.pipeline(transaction=False)
+    for task_id, (start, end), fingerprint, entry in zip(task_ids, ranges, fingerprints, cached):
+        if entry:
+            complete_from_cache(pipe, job_id, task_id, fingerprint, entry)
+            continue
+        queued.append(task_id)
+        descriptors.append(json.dumps({
+            'task_id': task_id,
+            'path': filepath,
+            'start': start,
+            'end': end,
+            'columns': columns,
+            'fingerprint': fingerprint,
+            **({'scope': scope} if scope else {}),
+            **({'profile': profile} if profile else {})
+        }))
+    
+    # Un seul LPUSH pour l'ensemble des descripteurs, aucune donnée ne transite par Redis
+    if descriptors:
+        pipe.lpush(job_queue_key(job_id), *descriptors)
+        record_queued(pipe, job_id, queued)
+    pipe.hset(f"job:{job_id}", 'tasks_count', len(task_ids))
+    pipe.execute()
+    feed_wakeup.set()
+    
+    duration = time.time() - start_time
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Distribution terminée - {len(task_ids)} descripteurs créés en {duration:.3f}s")
     
     return task_ids
 
+def resolve_data_files(data_path):
+    """Liste les fichiers de données : DATA_PATH est un fichier, un répertoire (parcouru récursivement) ou un motif glob."""
+    if os.path.isdir(data_path):
+        paths = glob.glob(os.path.join(data_path, '**', '*'), recursive=True)
+    elif glob.has_magic(data_path):
+        paths = glob.glob(data_path, recursive=True)
+    else:
+        return [data_path]
+    
+    return sorted(path for path in paths if path.endswith(DATA_FILE_SUFFIXES) and os.path.isfile(path))
+
+def is_partitioned_dataset(data_path):
+    """Un jeu de données est partitionné s'il ne se réduit pas à un unique fichier CSV non compressé."""
+    return os.path.isdir(data_path) or glob.has_magic(data_path) or not data_path.endswith('.csv')
+
+def partition_bounds(path):
+    """Valeurs extrêmes (incluses) déduites du chemin : {'date': (min, max), 'ville': (min, max)}.
+
+    La date vient du nom du fichier ou de son répertoire, la ville d'un
+    répertoire ville=<nom>. Une colonne absente du résultat est inconnue.
+    """
+    bounds = {}
+    city = PARTITION_CITY.search(path)
+    if city:
+        bounds['ville'] = (city.group(1), city.group(1))
+    
+    for part in (os.path.basename(path), os.path.basename(os.path.dirname(path))):
+        match = PARTITION_DAY.search(part)
+        if match:
+            try:
+                day = pd.Timestamp(*map(int, match.groups()))
+                bounds['date'] = (day, day)
+                break
+            except ValueError:
+                pass
+        match = PARTITION_MONTH.search(part)
+        if match:
+            try:
+                first_day = pd.Timestamp(int(match.group(1)), int(match.group(2)), 1)
+                bounds['date'] = (first_day, first_day + pd.offsets.MonthEnd(0))
+                break
+            except ValueError:
+                pass
+    
+    return bounds
+
+def in_scope(bounds, scope):
+    """Indique si une partition aux valeurs comprises dans `bounds` peut contenir des lignes du périmètre (borne inconnue : oui)."""
+    if not scope:
+        return True
+    
+    date_min, date_max = bounds.get('date', (None, None))
+    if scope.get('date_from') and date_max is not None and date_max < pd.Timestamp(scope['date_from']):
+        return False
+    if scope.get('date_to') and date_min is not None and date_min >= pd.Timestamp(scope['date_to']) + pd.Timedelta(days=1):
+        return False
+    
+    city_min, city_max = bounds.get('ville', (None, None))
+    if scope.get('villes') and city_min is not None and city_max is not None:
+        if not any(city_min <= city <= city_max for city in scope['villes']):
+            return False
+    if scope.get('type') and 'type' in bounds:
+        type_min, type_max = bounds['type']
+        if not type_min <= scope['type'] <= type_max:
+            return False
+    return True
+
+def inspect_partition(path):
+    """Lit les métadonnées d'un fichier sans parser ses données : format, taille, bornes, lignes.
+
+    Pour un Parquet, le nombre de lignes et les statistiques min/max des
+    colonnes date, ville et type de chaque groupe de lignes viennent du pied
+    de fichier ; pour un CSV, le nombre de lignes est estimé sur un
+    échantillon. Celui d'un CSV compressé n'est pas connu sans le décompresser.
+    """
+    stat = os.stat(path)
+    partition = {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime_ns,
+                 'bounds': partition_bounds(path), 'rows': None}
+    
+    if path.endswith('.parquet'):
+        metadata = pq.ParquetFile(path).metadata
+        names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+        row_groups = []
+        for index in range(metadata.num_row_groups):
+            row_group = metadata.row_group(index)
+            bounds = dict(partition['bounds'])
+            for column in ('date', 'ville', 'type'):
+                statistics = row_group.column(names.index(column)).statistics if column in names else None
+                if statistics is not None and statistics.has_min_max:
+                    convert = pd.Timestamp if column == 'date' else str
+                    bounds[column] = (convert(statistics.min), convert(statistics.max))
+            row_groups.append((index, row_group.num_rows, bounds))
+        partition.update(format='parquet', rows=metadata.num_rows, row_groups=row_groups)
+    elif path.endswith('.gz'):
+        partition['format'] = 'csv.gz'
+    else:
+        partition['format'] = 'csv'
+        partition['rows'], partition['bytes_per_row'] = estimate_row_count(path)
+    
+    return partition
+
+def plan_partition_tasks(partition, scope, rows_per_task, range_bytes):
+    """Découpe un fichier en descripteurs de tâches.
+
+    Un CSV est découpé en plages d'octets (de range_bytes, ou d'environ
+    rows_per_task lignes, sinon une seule plage) ; les groupes de lignes
+    Parquet du périmètre sont regroupés par tâches d'au plus rows_per_task
+    lignes (sinon une tâche par fichier) ; un CSV compressé, qui ne se lit
+    que séquentiellement, forme une seule tâche.
+    """
+    base = {'path': partition['path'], 'format': partition['format'], **({'scope': scope} if scope else {})}
+    
+    if partition['format'] == 'parquet':
+        selected = [(index, rows) for index, rows, bounds in partition['row_groups'] if in_scope(bounds, scope)]
+        groups, current, current_rows = [], [], 0
+        for index, rows in selected:
+            if current and rows_per_task and current_rows + rows > rows_per_task:
+                groups.append(current)
+                current, current_rows = [], 0
+            current.append(index)
+            current_rows += rows
+        if current:
+            groups.append(current)
+        return [{**base, 'row_groups': group} for group in groups]
+    
+    if partition['format'] == 'csv.gz':
+        return [base]
+    
+    if rows_per_task:
+        range_bytes = int(rows_per_task * partition['bytes_per_row'])
+    columns, ranges = compute_byte_ranges(partition['path'], 1, range_bytes)
+    return [{**base, 'start': start, 'end': end, 'columns': columns} for start, end in ranges]
+
+def plan_dataset(data_path, scope, num_workers, task_sizing, range_bytes):
+    """Inspecte les fichiers du jeu de données en parallèle et planifie ses tâches.
+
+    Les fichiers (puis, pour Parquet, les groupes de lignes) dont les dates
+    ou les villes sont hors du périmètre du job sont écartés sans être lus. Renvoie
+    (descripteurs, fichiers retenus, fichiers écartés, lignes estimées,
+    lignes par tâche, workers).
+    """
+    paths = resolve_data_files(data_path)
+    if not paths:
+        raise FileNotFoundError(f"Aucun fichier {'/'.join(DATA_FILE_SUFFIXES)} trouvé pour {data_path}")
+    
+    with ThreadPoolExecutor(max_workers=DISCOVERY_THREADS) as executor:
+        partitions = list(executor.map(inspect_partition, paths))
+        selected = [partition for partition in partitions
+                    if in_scope(partition['bounds'], scope)]
+        
+        estimated_rows = sum(partition['rows'] or 0 for partition in selected)
+        rows_per_task, worker_count = None, num_workers
+        if task_sizing == 'adaptive' and estimated_rows:
+            rows_per_task, worker_count = plan_task_rows(estimated_rows, num_workers)
+        
+        planned = executor.map(lambda partition: plan_partition_tasks(partition, scope, rows_per_task, range_bytes), selected)
+        descriptors = []
+        for partition, tasks in zip(selected, planned):
+            for task in tasks:
+                # Empreinte tirée de l'identité du fichier (taille, date de
+                # modification) : un fichier inchangé n'est pas relu pour le cache
+                task['fingerprint'] = chunk_fingerprint(json.dumps(task, sort_keys=True), f"{partition['size']}:{partition['mtime']}") if CHUNK_CACHE else None
+                descriptors.append(task)
+    
+    return descriptors, selected, len(partitions) - len(selected), estimated_rows, rows_per_task, worker_count
+
+def distribute_partitions(descriptors, job_id, profile=None):
+    """Distribue les descripteurs de partitions : les workers lisent eux-mêmes les fichiers."""
+    start_time = time.time()
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début de la distribution de {len(descriptors)} tâches de partitions (job_id: {job_id})")
+    
+    task_ids = [f"task:{job_id}:{i}" for i in range(len(descriptors))]
+    cached = lookup_chunk_cache([descriptor['fingerprint'] for descriptor in descriptors], job_id)
+    
+    queued = []
+    pipe = redis_client.pipeline(transaction=False)
+    for task_id, descriptor, entry in zip(task_ids, descriptors, cached):
+        if entry:
+            complete_from_cache(pipe, job_id, task_id, descriptor['fingerprint'], entry)
+            continue
+        queued.append(json.dumps({'task_id': task_id, **descriptor, **({'profile': profile} if profile else {})}))
+    
+    if queued:
+        pipe.lpush(job_queue_key(job_id), *queued)
+        record_queued(pipe, job_id, [task_id for task_id, entry in zip(task_ids, cached) if not entry])
+    pipe.hset(f"job:{job_id}", 'tasks_count', len(task_ids))
+    pipe.execute()
+    feed_wakeup.set()
+    
+    duration = time.time() - start_time
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Distribution terminée - {len(task_ids)} descripteurs créés en {duration:.3f}s")
+    
+    return task_ids
+
+def feed_task_queue():
+    """Alimente task_queue à tour de rôle depuis les files des jobs en cours.
+
+    task_queue ne contient jamais plus de DISPATCH_WINDOW tâches : un job
+    qui distribue des milliers de tâches n'empêche pas un job admis après
+    lui d'obtenir des workers. Les déplacements d'un tour sont envoyés en un
+    seul pipeline (LMOVE, atomique pour chaque tâche).
+    """
+    position = 0
+    while True:
+        feed_wakeup.wait(FEED_INTERVAL)
+        feed_wakeup.clear()
+        job_ids = list(running_jobs)
+        if not job_ids:
+            continue
+        
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.llen('task_queue')
+            pipe.zcount('workers:heartbeat', time.time() - WORKER_TTL, '+inf')
+            depth, live_workers = pipe.execute()
+            free = (DISPATCH_WINDOW or 2 * max(live_workers, 1)) - depth
+            
+            while free > 0 and job_ids:
+                pipe = redis_client.pipeline(transaction=False)
+                order = [job_ids[(position + i) % len(job_ids)] for i in range(min(free, len(job_ids)))]
+                for job_id in order:
+                    pipe.lmove(job_queue_key(job_id), 'task_queue', 'RIGHT', 'LEFT')
+                moved = pipe.execute()
+                position += len(order)
+                free -= sum(1 for item in moved if item is not None)
+                # Les jobs dont la file est vide sont ignorés jusqu'au tour suivant
+                empty = {job_id for job_id, item in zip(order, moved) if item is None}
+                job_ids = [job_id for job_id in job_ids if job_id not in empty]
+        except redis.ConnectionError as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️  Alimentation de task_queue interrompue: {str(e)}")
+
+def start_task_feeder():
+    """Démarre (une seule fois par processus) le thread d'alimentation de task_queue."""
+    if feeder_started.acquire(blocking=False):
+        threading.Thread(target=feed_task_queue, daemon=True).start()
+
+def task_id_of(item):
+    """Extrait l'identifiant de tâche d'un élément de task_queue."""
+    if item.startswith('{'):
+        return json.loads(item)['task_id']
+    return item
+
+def retry_or_abandon(pipe, item, attempts, reason):
+    """Remet la tâche en file, ou l'abandonne au-delà de MAX_TASK_ATTEMPTS exécutions."""
+    task_id = task_id_of(item)
+    if attempts < MAX_TASK_ATTEMPTS:
+        pipe.rpush('task_queue', item)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️  {reason} pour {task_id}: tâche remise en file (tentative {attempts + 1}/{MAX_TASK_ATTEMPTS})")
+    else:
+        pipe.hdel('task_attempts', item)
+        pipe.sadd(f"job:{task_id.split(':')[1]}:failed_tasks", task_id)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ❌ Tâche {task_id} abandonnée après {MAX_TASK_ATTEMPTS} tentatives")
+
+def requeue_expired_tasks():
+    """Remet en file les tâches dont le bail a expiré (worker arrêté ou bloqué).
+
+    Au-delà de MAX_TASK_ATTEMPTS relances, la tâche est abandonnée et
+    enregistrée dans job:<id>:failed_tasks.
+    """
+    expired = redis_client.zrangebyscore('task_leases', '-inf', time.time())
+    
+    for item in expired:
+        # ZREM garantit qu'un seul orchestrator reprend la tâche
+        if not redis_client.zrem('task_leases', item):
+            continue
+        
+        item = item.decode('utf-8')
+        owner = redis_client.hget('task_owners', item)
+        attempts = redis_client.hincrby('task_attempts', item, 1)
+        
+        pipe = redis_client.pipeline()
+        if owner:
+            pipe.lrem(f"processing:{owner.decode('utf-8')}", 1, item)
+            pipe.hdel('task_owners', item)
+        retry_or_abandon(pipe, item, attempts, "Bail expiré")
+        pipe.execute()
+    
+    requeue_orphaned_tasks()
+
+def requeue_orphaned_tasks():
+    """Remet en file les tâches prises par un worker arrêté avant d'avoir posé leur bail.
+
+    Un worker déplace la tâche dans sa file processing:<worker_id> (BLMOVE)
+    puis pose le bail dans un second aller-retour : s'il s'arrête entre les
+    deux, la tâche n'apparaît pas dans task_leases. Les files de traitement
+    (inscrites par les workers dans workers:processing_keys) sont parcourues
+    au plus toutes les LEASE_TIMEOUT / 3 secondes ; une tâche vue sans bail
+    pendant plus de LEASE_TIMEOUT secondes est remise en file. LREM garantit
+    qu'un seul orchestrator la reprend.
+    """
+    global last_orphan_scan
+    now = time.time()
+    if now - last_orphan_scan < LEASE_TIMEOUT / 3:
+        return
+    last_orphan_scan = now
+    
+    processing_keys = redis_client.smembers('workers:processing_keys')
+    if not processing_keys:
+        return
+    
+    pipe = redis_client.pipeline(transaction=False)
+    for key in processing_keys:
+        pipe.lrange(key, 0, -1)
+    items = [(key.decode('utf-8'), item) for key, key_items in zip(processing_keys, pipe.execute()) for item in key_items]
+    
+    pipe = redis_client.pipeline(transaction=False)
+    for _, item in items:
+        pipe.zscore('task_leases', item)
+    unleased = {item.decode('utf-8'): key for (key, item), lease in zip(items, pipe.execute()) if lease is None}
+    
+    # Tâches de nouveau sous bail, terminées ou reprises : plus suivies
+    for item in list(unleased_tasks):
+        if item not in unleased:
+            del unleased_tasks[item]
+    
+    for item, key in unleased.items():
+        first_seen = unleased_tasks.setdefault(item, (key, now))[1]
+        if now - first_seen < LEASE_TIMEOUT:
+            continue
+        
+        del unleased_tasks[item]
+        if not redis_client.lrem(key, 1, item):
+            continue
+        attempts = redis_client.hincrby('task_attempts', item, 1)
+        pipe = redis_client.pipeline()
+        retry_or_abandon(pipe, item, attempts, f"Tâche sans bail dans {key}")
+        pipe.execute()
+
 def monitor_progress(job_id):
-    """Surveille l'avancement du traitement."""
+    """Surveille l'avancement du traitement.
+
+    Les workers poussent chaque tâche terminée sur une liste propre au job :
+    l'orchestrator reste bloqué sur BLPOP et réagit dès la dernière tâche,
+    sans intervalle de polling.
+    """
     start_time = time.time()
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Début du monitoring du job {job_id}")
     
-    total_tasks = int(redis_client.get(f"job:{job_id}:tasks_count"))
+    total_tasks = int(redis_client.hget(f"job:{job_id}", 'tasks_count'))
+    events_key = f"job:{job_id}:completion_events"
     last_completed = 0
     
     while True:
-        # Compte les tâches terminées
+        # Compte les tâches terminées (l'ensemble absorbe les doublons)
         completed_tasks = redis_client.scard(f"job:{job_id}:completed_tasks")
         
         # Log uniquement si le nombre de tâches terminées a changé
@@ -87,18 +962,208 @@ def monitor_progress(job_id):
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Progression: {completed_tasks}/{total_tasks} tâches terminées (temps écoulé: {elapsed_time:.1f}s)")
             last_completed = completed_tasks
         
-        if completed_tasks == total_tasks:
-            # Notification à l'aggregator que toutes les tâches sont terminées
-            redis_client.publish('tasks_completed', job_id)
+        if completed_tasks >= total_tasks:
+            # Notification à l'aggregator que toutes les tâches sont terminées ;
+            # l'entrée du flux le réveille sans attendre la fin de son XREAD bloquant
+            pipe = redis_client.pipeline()
+            pipe.xadd(RESULTS_STREAM, {'job_id': job_id, 'event': 'tasks_completed'},
+                      maxlen=RESULTS_STREAM_MAXLEN, approximate=True)
+            pipe.publish('tasks_completed', job_id)
+            pipe.delete(events_key)
+            pipe.execute()
             end_time = time.time()
             total_duration = end_time - start_time
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Toutes les tâches du job {job_id} sont terminées - Durée totale de traitement: {total_duration:.2f}s")
             break
         
-        time.sleep(2)
+        failed_tasks = redis_client.scard(f"job:{job_id}:failed_tasks")
+        if failed_tasks:
+            raise RuntimeError(f"{failed_tasks} tâche(s) abandonnée(s) après {MAX_TASK_ATTEMPTS} tentatives")
+        
+        # Attente bloquante de la prochaine tâche terminée ; le timeout sert à
+        # revérifier l'ensemble et à relancer les tâches dont le bail a expiré
+        if redis_client.blpop(events_key, timeout=MONITOR_TIMEOUT):
+            # Consomme d'un coup les notifications déjà arrivées
+            redis_client.ltrim(events_key, 1, 0)
+        
+        requeue_expired_tasks()
+
+def register_job(job_id, start_time):
+    """Inscrit le job en cours dans le registre des jobs.
+
+    Le registre se compose de jobs:by_start (tous les jobs) et jobs:active
+    (jobs non terminés), deux sorted sets indexés par heure de début, et du
+    hash job:<id> qui regroupe toutes les métadonnées du job (statut, temps,
+    métriques). Un job déclenché par l'API y est déjà inscrit avec son heure
+    de déclenchement, conservée (NX). Les jobs identiques rattachés à ce job
+    passent en cours avec lui.
+    """
+    running = {
+        'status': 'running',
+        'orchestration_start': start_time,
+        'start_timestamp': datetime.now().isoformat()
+    }
+    pipe = redis_client.pipeline()
+    pipe.hset(f"job:{job_id}", mapping=running)
+    pipe.hsetnx(f"job:{job_id}", 'start_time', start_time)
+    pipe.zadd('jobs:by_start', {job_id: start_time}, nx=True)
+    pipe.zadd('jobs:active', {job_id: start_time}, nx=True)
+    pipe.lrange(f"job:{job_id}:followers", 0, -1)
+    followers = pipe.execute()[-1]
+    
+    if followers:
+        pipe = redis_client.pipeline()
+        for follower in followers:
+            pipe.hset(b"job:" + follower, mapping=running)
+        pipe.execute()
+
+def record_steps(job_id, step_times, step_timestamps):
+    """Enregistre les temps des étapes terminées en un seul aller-retour."""
+    redis_client.hset(f"job:{job_id}", mapping={
+        'step_times': json.dumps(step_times),
+        'step_timestamps': json.dumps(step_timestamps)
+    })
+
+def purge_job_state(job_id, ingestion_mode):
+    """Libère la mémoire d'un job terminé ou en échec.
+
+    Les payloads encore présents (tâches jamais traitées d'un job en échec)
+    sont supprimés et l'état intermédiaire reçoit une durée de vie
+    JOB_STATE_TTL. Renvoie le total d'octets libérés pour ce job, y compris
+    les payloads supprimés par les workers.
+    """
+    tasks_count = redis_client.hget(f"job:{job_id}", 'tasks_count')
+    leftover_bytes = 0
+    
+    if ingestion_mode not in ('reference', 'partitioned') and tasks_count is not None:
+        task_keys = [f"task:{job_id}:{i}" for i in range(int(tasks_count))]
+        pipe = redis_client.pipeline(transaction=False)
+        for task_key in task_keys:
+            pipe.strlen(task_key)
+        sizes = pipe.execute()
+        leftover_keys = [key for key, size in zip(task_keys, sizes) if size]
+        leftover_bytes = sum(sizes)
+        if leftover_keys:
+            redis_client.delete(*leftover_keys)
+    
+    pipe = redis_client.pipeline()
+    # Tâches jamais envoyées aux workers (job en échec)
+    pipe.delete(job_queue_key(job_id))
+    if JOB_STATE_TTL:
+        for key in ('task_rows', 'completed_tasks', 'completion_events', 'failed_tasks', 'fingerprints', 'queued_at', 'spans',
+                    'profile_stacks', 'profile_stats'):
+            pipe.expire(f"job:{job_id}:{key}", JOB_STATE_TTL)
+    pipe.hincrby(f"job:{job_id}", 'reclaimed_bytes', leftover_bytes)
+    return pipe.execute()[-1]
+
+def trim_job_registry():
+    """Retire du registre les jobs au-delà des JOBS_HISTORY_SIZE plus récents."""
+    evicted = redis_client.zrange('jobs:by_start', 0, -JOBS_HISTORY_SIZE - 1)
+    if not evicted:
+        return
+    
+    pipe = redis_client.pipeline()
+    pipe.delete(*[f"job:{job_id.decode('utf-8')}" for job_id in evicted])
+    pipe.zrem('jobs:by_start', *evicted)
+    pipe.zrem('jobs:active', *evicted)
+    pipe.execute()
+
+def prune_dead_workers():
+    """Supprime les traces des workers sans battement depuis WORKER_TTL secondes.
+
+    Un worker arrêté brutalement ou recréé (nouvel identifiant hôte:pid)
+    laisse son entrée dans workers:heartbeat et ses compteurs dans
+    workers:throughput, workers:tasks_processed et workers:rows_processed.
+    Sa file de traitement n'est plus surveillée une fois vide ; les tâches
+    qu'elle contient encore sont d'abord remises en file par
+    requeue_orphaned_tasks.
+    """
+    cutoff = time.time() - WORKER_TTL
+    heartbeats = redis_client.zrange('workers:heartbeat', 0, -1, withscores=True)
+    dead = [worker for worker, last_seen in heartbeats if last_seen < cutoff]
+    live = {worker.decode('utf-8') for worker, last_seen in heartbeats if last_seen >= cutoff}
+    processing_keys = [key for key in redis_client.smembers('workers:processing_keys')
+                       if key.decode('utf-8')[len('processing:'):] not in live]
+    
+    pipe = redis_client.pipeline(transaction=False)
+    for key in processing_keys:
+        pipe.llen(key)
+    idle_keys = [key for key, length in zip(processing_keys, pipe.execute()) if not length]
+    if not dead and not idle_keys:
+        return
+    
+    pipe = redis_client.pipeline()
+    if dead:
+        pipe.zrem('workers:heartbeat', *dead)
+        for key in ('workers:throughput', 'workers:tasks_processed', 'workers:rows_processed'):
+            pipe.hdel(key, *dead)
+    if idle_keys:
+        pipe.srem('workers:processing_keys', *idle_keys)
+    pipe.execute()
+    
+    if dead:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️  {len(dead)} worker(s) sans battement depuis {WORKER_TTL}s retiré(s) des métriques")
+
+# Copie identique de observe_histogram dans worker/main.py (chaque service a sa
+# propre image) : toute modification doit être reportée dans les deux
+def observe_histogram(pipe, key, buckets, value):
+    """Ajoute une observation à un histogramme stocké dans un hash Redis.
+
+    Un compteur par intervalle (non cumulé, cumulé à l'exposition), la somme
+    et le nombre d'observations, ainsi que les bornes elles-mêmes (champ
+    `bounds`) : l'API les expose telles quelles, sans en garder de copie.
+    Quatre commandes dans le pipeline en cours.
+    """
+    bucket = next((str(bound) for bound in buckets if value <= bound), '+Inf')
+    pipe.hincrby(key, bucket, 1)
+    pipe.hincrbyfloat(key, 'sum', value)
+    pipe.hincrby(key, 'count', 1)
+    pipe.hset(key, 'bounds', ','.join(str(bound) for bound in buckets))
+
+def close_job(job_id, fields):
+    """Enregistre l'issue du job dans son hash et le retire des jobs actifs.
+
+    Les écritures forment une transaction : un job n'est jamais vu terminé
+    tout en restant listé parmi les jobs actifs. Les jobs identiques qui ont
+    partagé son exécution reçoivent la même issue.
+    """
+    followers = [follower.decode('utf-8') for follower in redis_client.lrange(f"job:{job_id}:followers", 0, -1)]
+    
+    pipe = redis_client.pipeline()
+    for job in [job_id] + followers:
+        pipe.hset(f"job:{job}", mapping=fields)
+        pipe.zrem('jobs:active', job)
+    if JOB_STATE_TTL:
+        pipe.expire(f"job:{job_id}:followers", JOB_STATE_TTL)
+    observe_histogram(pipe, f"metrics:job_duration:{fields['status']}", JOB_DURATION_BUCKETS, float(fields['duration']))
+    pipe.execute()
+    
+    trim_job_registry()
+    prune_dead_workers()
+
+def complete_empty_job(job_id, processing_mode, overall_start_time):
+    """Termine un job sans transaction à traiter : aucun chunk distribué, résultats vides."""
+    total_duration = time.time() - overall_start_time
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ Aucune transaction à traiter pour ce job")
+    close_job(job_id, {
+        'status': 'completed',
+        'duration': total_duration,
+        'tasks_count': 0,
+        'performance_metrics': json.dumps({'total_rows': 0, 'processing_mode': processing_mode, 'num_chunks': 0}),
+        'completion_time': time.time(),
+        'completion_timestamp': datetime.now().isoformat()
+    })
 
-def run_orchestration(job_id=None):
-    """Execute l'orchestration complète des données."""
+def run_orchestration(job_id=None, processing_mode=None, scope=None, profile=None):
+    """Execute l'orchestration complète des données.
+
+    `scope` limite le job à un périmètre ({'villes', 'type', 'date_from',
+    'date_to'}) : les partitions hors périmètre ne sont pas lues et les
+    autres lignes sont filtrées dès la lecture, avant sérialisation et
+    distribution. Les résultats sont stockés pour ce périmètre.
+    `profile` ('sampling' ou 'cprofile') active le profilage des tâches du
+    job par les workers.
+    """
     if not job_id:
         job_id = str(uuid.uuid4())
     
@@ -107,61 +1172,195 @@ def run_orchestration(job_id=None):
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🚀 Job ID: {job_id}")
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🕐 Temps de début: {datetime.now().isoformat()}")
     
-    # Mise à jour du statut et temps de début
-    redis_client.set(f"job:{job_id}:status", "running")
-    redis_client.set(f"job:{job_id}:orchestration_start", str(overall_start_time))
-    redis_client.set(f"job:{job_id}:start_timestamp", datetime.now().isoformat())
+    # Mise à jour du statut et temps de début ; les tâches du job sont
+    # envoyées aux workers à tour de rôle avec celles des autres jobs en cours
+    register_job(job_id, overall_start_time)
+    running_jobs[job_id] = overall_start_time
+    if profile:
+        # Lu par les workers avec le payload de chaque tâche (ou transmis dans les descripteurs)
+        redis_client.hset(f"job:{job_id}", 'profile', profile)
+        profiled_jobs.add(job_id)
+    start_task_feeder()
     
     # Configurations
     data_path = os.environ.get('DATA_PATH', '/data/transactions_autoconnect.csv')
     num_workers = int(os.environ.get('NUM_WORKERS', 3))
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚙️  Configuration: {num_workers} workers, données: {data_path}")
+    ingestion_mode = os.environ.get('INGESTION_MODE', 'memory')
+    batch_rows = int(os.environ.get('BATCH_ROWS', 50000))
+    range_bytes = int(os.environ.get('RANGE_BYTES', 0))
+    task_sizing = os.environ.get('TASK_SIZING', 'fixed')
+    processing_mode = processing_mode or PROCESSING_MODE
+    scope = normalize_scope(scope)
+    if is_partitioned_dataset(data_path):
+        # Répertoire, motif glob, CSV compressé ou Parquet : les workers lisent les fichiers
+        ingestion_mode = 'partitioned'
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚙️  Configuration: {num_workers} workers, données: {data_path}, ingestion: {ingestion_mode}, dimensionnement: {task_sizing}, traitement: {processing_mode}{f', périmètre: {scope}' if scope else ''}{f', profilage: {profile}' if profile else ''}")
     
     try:
         # Métriques par étape avec timestamps
         step_times = {}
         step_timestamps = {}
+        rows_per_task = None
+        worker_count = num_workers
         
-        # 1. Charger les données
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPE 1/4: Chargement des données")
-        step_start = time.time()
-        step_timestamps['data_loading_start'] = datetime.now().isoformat()
+        if (ingestion_mode == 'partitioned' or scope) and processing_mode == 'incremental':
+            # Le repère et l'état cumulé portent sur un fichier unique et
+            # complet ; le cache des chunks évite de retraiter ce qui n'a pas changé
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️  Traitement incrémental indisponible pour un jeu partitionné ou un job limité à un périmètre: traitement complet")
+            processing_mode = 'full'
         
-        data = load_data(data_path)
+        if ingestion_mode == 'partitioned':
+            # 1-3. Découverte des fichiers, élagage des partitions hors périmètre
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPES 1-3/4: Découverte et distribution des partitions")
+            step_start = time.time()
+            step_timestamps['partition_planning_start'] = datetime.now().isoformat()
+            
+            descriptors, partitions, pruned_files, estimated_rows, rows_per_task, worker_count = plan_dataset(data_path, scope, num_workers, task_sizing, range_bytes)
+            processed_bytes = sum(partition['size'] for partition in partitions)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🗂️  {len(partitions)} fichier(s) retenu(s), {pruned_files} écarté(s) par le périmètre, {len(descriptors)} tâche(s), ~{estimated_rows} lignes")
+            redis_client.hset(f"job:{job_id}", mapping={
+                'processing_mode': processing_mode,
+                'dataset_files': len(partitions),
+                'pruned_files': pruned_files,
+                **({'scope': json.dumps(scope), 'scope_id': scope_key(scope)} if scope else {})
+            })
+            empty = not descriptors
+        else:
+            # Plage d'octets à traiter : tout le fichier, ou les lignes ajoutées
+            # depuis le repère du dernier job. L'aggregator avance le repère quand
+            # il fusionne les résultats du job dans l'état cumulé
+            processing_mode, window_start, window_end, window_fingerprint = plan_data_window(data_path, processing_mode)
+            window = (window_start, window_end)
+            processed_bytes = window_end - window_start
+            if scope:
+                # Résultats propres au périmètre : l'état cumulé du fichier n'est pas modifié
+                redis_client.hset(f"job:{job_id}", mapping={
+                    'processing_mode': processing_mode,
+                    'scope': json.dumps(scope),
+                    'scope_id': scope_key(scope)
+                })
+            else:
+                redis_client.hset(f"job:{job_id}", mapping={
+                    'data_path': data_path,
+                    'processing_mode': processing_mode,
+                    'watermark_start': window_start,
+                    'watermark_end': window_end,
+                    'watermark_fingerprint': window_fingerprint
+                })
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📍 Plage à traiter ({processing_mode}): octets {window_start} à {window_end} ({processed_bytes / 1024 / 1024:.1f} Mo)")
+            empty = window_start >= window_end
         
-        step_times['data_loading'] = time.time() - step_start
-        step_timestamps['data_loading_end'] = datetime.now().isoformat()
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPE 1/4 terminée en {step_times['data_loading']:.2f}s - {len(data)} lignes chargées")
-        redis_client.set(f"job:{job_id}:step_times", json.dumps(step_times))
-        redis_client.set(f"job:{job_id}:step_timestamps", json.dumps(step_timestamps))
+        if empty:
+            # Aucune ligne nouvelle (ou aucune partition dans le périmètre) : rien à distribuer
+            complete_empty_job(job_id, processing_mode, overall_start_time)
+            return
         
-        # 2. Diviser les données
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPE 2/4: Division des données")
-        step_start = time.time()
-        step_timestamps['data_splitting_start'] = datetime.now().isoformat()
+        # Hors mode mémoire, le volume est estimé avant lecture pour dimensionner les tâches
+        if task_sizing == 'adaptive' and ingestion_mode in ('streaming', 'reference'):
+            estimated_rows, bytes_per_row = estimate_row_count(data_path, window=window)
+            rows_per_task, worker_count = plan_task_rows(estimated_rows, num_workers)
+            batch_rows = rows_per_task
+            range_bytes = int(rows_per_task * bytes_per_row)
         
-        chunks = split_data(data, num_workers)
+        if ingestion_mode == 'partitioned':
+            # Distribution des descripteurs : la lecture et le parsing des
+            # fichiers sont répartis entre les workers
+            task_ids = distribute_partitions(descriptors, job_id, profile)
+            
+            step_times['partition_planning'] = time.time() - step_start
+            step_timestamps['partition_planning_end'] = datetime.now().isoformat()
+            num_chunks = len(task_ids)
+            distribution_rate = num_chunks / step_times['partition_planning'] if step_times['partition_planning'] > 0 else 0
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPES 1-3/4 terminées en {step_times['partition_planning']:.3f}s - {num_chunks} tâches distribuées")
+            record_steps(job_id, step_times, step_timestamps)
+            del descriptors
+        elif ingestion_mode == 'streaming':
+            # 1-3. Lecture, découpage et distribution fusionnés : chaque lot est
+            # distribué dès qu'il est parsé
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPES 1-3/4: Ingestion en streaming")
+            step_start = time.time()
+            step_timestamps['streaming_ingestion_start'] = datetime.now().isoformat()
+            
+            task_ids, total_rows = stream_tasks(data_path, job_id, batch_rows, window, scope)
+            
+            step_times['streaming_ingestion'] = time.time() - step_start
+            step_timestamps['streaming_ingestion_end'] = datetime.now().isoformat()
+            num_chunks = len(task_ids)
+            avg_chunk_size = total_rows // num_chunks if num_chunks else 0
+            distribution_rate = num_chunks / step_times['streaming_ingestion'] if step_times['streaming_ingestion'] > 0 else 0
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPES 1-3/4 terminées en {step_times['streaming_ingestion']:.2f}s - {total_rows} lignes, {num_chunks} tâches (taille moyenne: {avg_chunk_size} lignes)")
+            record_steps(job_id, step_times, step_timestamps)
+        elif ingestion_mode == 'reference':
+            # 1-3. Calcul des plages d'octets : les workers lisent directement le fichier partagé
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPES 1-3/4: Découpage en plages d'octets")
+            step_start = time.time()
+            step_timestamps['range_planning_start'] = datetime.now().isoformat()
+            
+            columns, ranges = compute_byte_ranges(data_path, num_workers, range_bytes, window)
+            task_ids = distribute_ranges(data_path, columns, ranges, job_id, scope, profile)
+            
+            step_times['range_planning'] = time.time() - step_start
+            step_timestamps['range_planning_end'] = datetime.now().isoformat()
+            num_chunks = len(task_ids)
+            distribution_rate = num_chunks / step_times['range_planning'] if step_times['range_planning'] > 0 else 0
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPES 1-3/4 terminées en {step_times['range_planning']:.3f}s - {num_chunks} plages d'octets distribuées")
+            record_steps(job_id, step_times, step_timestamps)
+        else:
+            # 1. Charger les données
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPE 1/4: Chargement des données")
+            step_start = time.time()
+            step_timestamps['data_loading_start'] = datetime.now().isoformat()
         
-        step_times['data_splitting'] = time.time() - step_start
-        step_timestamps['data_splitting_end'] = datetime.now().isoformat()
-        avg_chunk_size = len(data) // len(chunks) if chunks else 0
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPE 2/4 terminée en {step_times['data_splitting']:.2f}s - {len(chunks)} chunks créés (taille moyenne: {avg_chunk_size} lignes)")
-        redis_client.set(f"job:{job_id}:step_times", json.dumps(step_times))
-        redis_client.set(f"job:{job_id}:step_timestamps", json.dumps(step_timestamps))
+            data = filter_scope(load_data(data_path, window), scope)
         
-        # 3. Distribuer les tâches
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPE 3/4: Distribution des tâches")
-        step_start = time.time()
-        step_timestamps['task_distribution_start'] = datetime.now().isoformat()
+            step_times['data_loading'] = time.time() - step_start
+            step_timestamps['data_loading_end'] = datetime.now().isoformat()
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPE 1/4 terminée en {step_times['data_loading']:.2f}s - {len(data)} lignes chargées")
+            record_steps(job_id, step_times, step_timestamps)
+            if data.empty:
+                # Aucune transaction dans le périmètre : même issue qu'en streaming ou par plages
+                complete_empty_job(job_id, processing_mode, overall_start_time)
+                return
+        
+            # 2. Diviser les données
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPE 2/4: Division des données")
+            step_start = time.time()
+            step_timestamps['data_splitting_start'] = datetime.now().isoformat()
+        
+            if task_sizing == 'adaptive':
+                rows_per_task, worker_count = plan_task_rows(len(data), num_workers)
+                chunk_rows = rows_per_task
+            else:
+                # Un chunk par worker environ, sur une grille stable si le cache est actif
+                chunk_rows = -(-len(data) // num_workers)
+                if CHUNK_CACHE:
+                    chunk_rows = stable_task_rows(chunk_rows)
+            
+            chunks = split_data(data, chunk_rows)
+        
+            step_times['data_splitting'] = time.time() - step_start
+            step_timestamps['data_splitting_end'] = datetime.now().isoformat()
+            avg_chunk_size = len(data) // len(chunks) if chunks else 0
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPE 2/4 terminée en {step_times['data_splitting']:.2f}s - {len(chunks)} chunks créés (taille moyenne: {avg_chunk_size} lignes)")
+            record_steps(job_id, step_times, step_timestamps)
         
-        distribute_tasks(chunks, job_id)
+            # 3. Distribuer les tâches
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPE 3/4: Distribution des tâches")
+            step_start = time.time()
+            step_timestamps['task_distribution_start'] = datetime.now().isoformat()
         
-        step_times['task_distribution'] = time.time() - step_start
-        step_timestamps['task_distribution_end'] = datetime.now().isoformat()
-        distribution_rate = len(chunks) / step_times['task_distribution'] if step_times['task_distribution'] > 0 else 0
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPE 3/4 terminée en {step_times['task_distribution']:.2f}s - Débit: {distribution_rate:.1f} tâches/sec")
-        redis_client.set(f"job:{job_id}:step_times", json.dumps(step_times))
-        redis_client.set(f"job:{job_id}:step_timestamps", json.dumps(step_timestamps))
+            distribute_tasks(chunks, job_id)
+        
+            step_times['task_distribution'] = time.time() - step_start
+            step_timestamps['task_distribution_end'] = datetime.now().isoformat()
+            distribution_rate = len(chunks) / step_times['task_distribution'] if step_times['task_distribution'] > 0 else 0
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ✅ ÉTAPE 3/4 terminée en {step_times['task_distribution']:.2f}s - Débit: {distribution_rate:.1f} tâches/sec")
+            record_steps(job_id, step_times, step_timestamps)
+            
+            total_rows = len(data)
+            num_chunks = len(chunks)
+            # Les chunks sont dans Redis, inutile de garder le DataFrame pendant le monitoring
+            del data, chunks
         
         # 4. Surveiller l'avancement
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  ÉTAPE 4/4: Monitoring du traitement")
@@ -179,21 +1378,41 @@ def run_orchestration(job_id=None):
         step_times['total'] = total_duration
         step_timestamps['orchestration_end'] = datetime.now().isoformat()
         
+        # Lorsque les workers lisent les fichiers, eux seuls connaissent le nombre de lignes
+        if ingestion_mode in ('reference', 'partitioned'):
+            total_rows = sum(int(rows) for rows in redis_client.hvals(f"job:{job_id}:task_rows"))
+            avg_chunk_size = total_rows // num_chunks if num_chunks else 0
+        
         # Calculs des métriques de performance
-        total_rows = len(data)
         throughput = total_rows / total_duration if total_duration > 0 else 0
+        reclaimed_bytes = purge_job_state(job_id, ingestion_mode)
+        
+        # Chunks servis par le cache, sans passer par un worker
+        cache_hits = int(redis_client.hget(f"job:{job_id}", 'cache_hits') or 0)
+        cache_hit_rate = cache_hits / num_chunks if num_chunks else 0
+        if CHUNK_CACHE:
+            evict_chunk_cache()
         
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] === ORCHESTRATION TERMINÉE ===")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🏁 Durée totale: {total_duration:.2f}s")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📊 RAPPORT DÉTAILLÉ DES TEMPS:")
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   📂 Chargement données: {step_times['data_loading']:.2f}s ({(step_times['data_loading']/total_duration*100):.1f}%) - {total_rows/step_times['data_loading']:.0f} lignes/sec")
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   ✂️  Division données: {step_times['data_splitting']:.2f}s ({(step_times['data_splitting']/total_duration*100):.1f}%) - {len(chunks)/step_times['data_splitting']:.1f} chunks/sec")
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   📤 Distribution tâches: {step_times['task_distribution']:.2f}s ({(step_times['task_distribution']/total_duration*100):.1f}%) - {len(chunks)/step_times['task_distribution']:.1f} tâches/sec")
+        if ingestion_mode == 'partitioned':
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   🗂️  Découverte partitions: {step_times['partition_planning']:.3f}s ({(step_times['partition_planning']/total_duration*100):.1f}%) - {distribution_rate:.1f} tâches/sec")
+        elif ingestion_mode == 'reference':
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   📐 Découpage plages: {step_times['range_planning']:.3f}s ({(step_times['range_planning']/total_duration*100):.1f}%) - {distribution_rate:.1f} tâches/sec")
+        elif ingestion_mode == 'streaming':
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   🌊 Ingestion streaming: {step_times['streaming_ingestion']:.2f}s ({(step_times['streaming_ingestion']/total_duration*100):.1f}%) - {distribution_rate:.1f} tâches/sec")
+        else:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   📂 Chargement données: {step_times['data_loading']:.2f}s ({(step_times['data_loading']/total_duration*100):.1f}%) - {total_rows/step_times['data_loading']:.0f} lignes/sec")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   ✂️  Division données: {step_times['data_splitting']:.2f}s ({(step_times['data_splitting']/total_duration*100):.1f}%) - {num_chunks/step_times['data_splitting']:.1f} chunks/sec")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   📤 Distribution tâches: {step_times['task_distribution']:.2f}s ({(step_times['task_distribution']/total_duration*100):.1f}%) - {num_chunks/step_times['task_distribution']:.1f} tâches/sec")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   👀 Monitoring: {step_times['monitoring']:.2f}s ({(step_times['monitoring']/total_duration*100):.1f}%)")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📈 Performance globale:")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   • Débit total: {throughput:.0f} lignes/seconde")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   • Volume traité: {total_rows:,} lignes")
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   • Parallélisme: {num_workers} workers")
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   • Parallélisme: {worker_count} workers")
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   • Mémoire Redis libérée: {reclaimed_bytes / 1024 / 1024:.1f} Mo")
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]   • Cache des chunks: {cache_hits}/{num_chunks} tâches servies par le cache ({cache_hit_rate * 100:.1f}%)")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🕐 Heure de fin: {datetime.now().isoformat()}")
         
         # Mise à jour du statut final avec toutes les métriques détaillées
@@ -203,16 +1422,28 @@ def run_orchestration(job_id=None):
             'avg_chunk_size': avg_chunk_size,
             'distribution_rate': distribution_rate,
             'num_workers': num_workers,
-            'num_chunks': len(chunks)
+            'live_workers': worker_count,
+            'task_sizing': task_sizing,
+            'rows_per_task': rows_per_task,
+            'num_chunks': num_chunks,
+            'ingestion_mode': ingestion_mode,
+            'task_format': TASK_FORMAT,
+            'processing_mode': processing_mode,
+            'processed_bytes': processed_bytes,
+            'cache_hits': cache_hits,
+            'cache_hit_rate': cache_hit_rate,
+            'reclaimed_bytes': reclaimed_bytes
         }
         
-        redis_client.set(f"job:{job_id}:status", "completed")
-        redis_client.set(f"job:{job_id}:duration", str(total_duration))
-        redis_client.set(f"job:{job_id}:step_times", json.dumps(step_times))
-        redis_client.set(f"job:{job_id}:step_timestamps", json.dumps(step_timestamps))
-        redis_client.set(f"job:{job_id}:performance_metrics", json.dumps(performance_metrics))
-        redis_client.set(f"job:{job_id}:completion_time", str(overall_end_time))
-        redis_client.set(f"job:{job_id}:completion_timestamp", datetime.now().isoformat())
+        close_job(job_id, {
+            'status': 'completed',
+            'duration': total_duration,
+            'step_times': json.dumps(step_times),
+            'step_timestamps': json.dumps(step_timestamps),
+            'performance_metrics': json.dumps(performance_metrics),
+            'completion_time': overall_end_time,
+            'completion_timestamp': datetime.now().isoformat()
+        })
         
     except Exception as e:
         error_time = time.time()
@@ -223,11 +1454,107 @@ def run_orchestration(job_id=None):
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏱️  Durée avant erreur: {error_duration:.2f}s")
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🕐 Heure d'erreur: {error_timestamp}")
         
-        redis_client.set(f"job:{job_id}:status", "failed")
-        redis_client.set(f"job:{job_id}:error", str(e))
-        redis_client.set(f"job:{job_id}:error_time", str(error_time))
-        redis_client.set(f"job:{job_id}:error_timestamp", error_timestamp)
-        redis_client.set(f"job:{job_id}:duration", str(error_duration))
+        reclaimed_bytes = purge_job_state(job_id, ingestion_mode)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ♻️  Mémoire Redis libérée: {reclaimed_bytes / 1024 / 1024:.1f} Mo")
+        
+        close_job(job_id, {
+            'status': 'failed',
+            'error': str(e),
+            'error_time': error_time,
+            'error_timestamp': error_timestamp,
+            'duration': error_duration
+        })
+    
+    finally:
+        running_jobs.pop(job_id, None)
+        profiled_jobs.discard(job_id)
+
+def request_key(request):
+    """Clé de déduplication : deux demandes de même source, mode et périmètre produisent les mêmes résultats.
+
+    Le mode de profilage en fait partie : un job profilé n'est pas rattaché à
+    un job qui ne l'est pas.
+    """
+    identity = {
+        'data_path': os.environ.get('DATA_PATH', '/data/transactions_autoconnect.csv'),
+        'processing_mode': request.get('processing_mode') or PROCESSING_MODE,
+        'scope': normalize_scope(request.get('scope')),
+        'profile': request.get('profile')
+    }
+    return hashlib.md5(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+def submit_job(job_id, request):
+    """Place un job dans la file d'admission, ou le rattache à un job identique en attente.
+
+    jobs:pending est un sorted set trié par priorité décroissante puis par
+    heure d'arrivée ; jobs:pending_requests associe la clé de chaque demande
+    en attente à son job. Un job rattaché ne s'exécute pas : il suit le job
+    en attente (champ shared_with) et en reçoit l'issue.
+    """
+    key = request_key(request)
+    priority = int(request.get('priority') or 0)
+    
+    with scheduler_lock:
+        leader = redis_client.hget('jobs:pending_requests', key)
+        if leader and redis_client.zscore('jobs:pending', leader) is not None:
+            leader = leader.decode('utf-8')
+            pipe = redis_client.pipeline()
+            pipe.hset(f"job:{job_id}", mapping={'status': 'queued', 'shared_with': leader})
+            pipe.rpush(f"job:{leader}:followers", job_id)
+            pipe.execute()
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🔗 Job {job_id} identique au job en attente {leader}: exécution partagée")
+            return
+        
+        pipe = redis_client.pipeline()
+        pipe.hset(f"job:{job_id}", mapping={
+            'status': 'queued',
+            'request': json.dumps(request),
+            'request_key': key,
+            'priority': priority,
+            'queued_at': time.time()
+        })
+        pipe.zadd('jobs:pending', {job_id: time.time() - priority * PRIORITY_STEP})
+        pipe.hset('jobs:pending_requests', key, job_id)
+        pipe.zcard('jobs:pending')
+        pending = pipe.execute()[-1]
+    
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📥 Job {job_id} en attente d'admission (priorité {priority}, {pending} job(s) en attente)")
+
+def run_admitted_job(job_id, request):
+    """Orchestre un job admis, puis libère sa place d'exécution."""
+    try:
+        run_orchestration(job_id, request.get('processing_mode'), request.get('scope'), request.get('profile'))
+    finally:
+        job_slots.release()
+
+def run_scheduler():
+    """Admet les jobs en attente dès qu'une place d'exécution se libère.
+
+    Au plus MAX_CONCURRENT_JOBS jobs sont orchestrés (et gardent leurs données
+    en mémoire) à la fois ; une rafale de demandes attend dans Redis, où elle
+    survit à un redémarrage de l'orchestrator.
+    """
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🗓️  Ordonnanceur démarré ({MAX_CONCURRENT_JOBS} job(s) simultané(s) au plus)")
+    
+    while True:
+        job_slots.acquire()
+        popped = redis_client.bzpopmin('jobs:pending', timeout=5)
+        if not popped:
+            job_slots.release()
+            # Ordonnanceur inactif : nettoyage des workers disparus
+            prune_dead_workers()
+            continue
+        
+        job_id = popped[1].decode('utf-8')
+        with scheduler_lock:
+            # Le job n'est plus en attente : une demande identique ultérieure sera exécutée à part
+            request_json, key = redis_client.hmget(f"job:{job_id}", 'request', 'request_key')
+            if key and redis_client.hget('jobs:pending_requests', key) == job_id.encode('utf-8'):
+                redis_client.hdel('jobs:pending_requests', key)
+        
+        request = json.loads(request_json) if request_json else {}
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🚀 Admission du job {job_id} ({len(running_jobs) + 1}/{MAX_CONCURRENT_JOBS} places occupées)")
+        threading.Thread(target=run_admitted_job, args=(job_id, request), daemon=True).start()
 
 def listen_for_triggers():
     """Écoute les messages Redis pour déclencher l'orchestration."""
@@ -240,15 +1567,13 @@ def listen_for_triggers():
         if message['type'] == 'message':
             try:
                 data = json.loads(message['data'])
-                job_id = data.get('job_id')
+                job_id = data.get('job_id') or str(uuid.uuid4())
+                request = {key: data[key] for key in ('processing_mode', 'scope', 'priority', 'profile') if data.get(key)}
                 
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 📡 Signal de traitement reçu pour job_id: {job_id}")
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🚀 Lancement de l'orchestration...")
                 
-                # Lancer l'orchestration dans un thread séparé
-                thread = threading.Thread(target=run_orchestration, args=(job_id,))
-                thread.daemon = True
-                thread.start()
+                # L'ordonnanceur lance l'orchestration quand une place se libère
+                submit_job(job_id, request)
                 
             except json.JSONDecodeError:
                 print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠️  Message Redis invalide reçu")
@@ -260,8 +1585,10 @@ def main():
         # Mode standalone - exécute directement l'orchestration
         run_orchestration()
     else:
-        # Mode listener - écoute les signaux Redis
+        # Mode listener - écoute les signaux Redis ; l'ordonnanceur admet les jobs
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Orchestrator en mode écoute Redis")
+        threading.Thread(target=run_scheduler, daemon=True).start()
+        start_task_feeder()
         listen_for_triggers()
 
 if __name__ == "__main__":
@@ -1,118 +1,522 @@
 import pandas as pd
+import pyarrow.parquet as pq
 import redis
 import json
 import os
+import io
+import cProfile
+import marshal
+import mmap
+import multiprocessing
+import pstats
+import signal
+import socket
+import sys
+import threading
 import time
+from collections import Counter, OrderedDict
 
 # Configuration Redis
 redis_client = redis.Redis(host=os.environ.get('REDIS_HOST', 'redis'), port=6379, db=0)
 
-def process_monthly_revenue_by_city(df):
-    """Calcule le chiffre d'affaires mensuel par ville."""
-    # Convertir les dates en format datetime
-    df['date'] = pd.to_datetime(df['date'])
+# Identifiant du worker (battements de cœur et débit mesuré)
+WORKER_ID = os.environ.get('WORKER_ID', f"{socket.gethostname()}:{os.getpid()}")
+
+# Nombre de processus de traitement dans ce conteneur
+WORKER_CONCURRENCY = int(os.environ.get('WORKER_CONCURRENCY', 1))
+
+# Arrêt demandé (SIGTERM/SIGINT) : la tâche en cours est terminée avant de sortir
+stop_requested = threading.Event()
+
+# File de traitement propre au worker : une tâche prise y reste jusqu'à son
+# acquittement, et peut être relancée si le worker disparaît
+PROCESSING_KEY = f"processing:{WORKER_ID}"
+
+# Durée (s) d'un bail sur une tâche ; il est prolongé tant que le worker travaille
+LEASE_TIMEOUT = int(os.environ.get('LEASE_TIMEOUT', 30))
+
+# Flux Redis consommé par l'aggregator pour fusionner les résultats au fil de l'eau
+RESULTS_STREAM = 'task_results'
+RESULTS_STREAM_MAXLEN = int(os.environ.get('RESULTS_STREAM_MAXLEN', 10000))
+
+# Colonnes utilisées par les calculs : seules celles-ci sont lues dans les fichiers
+SUMMARY_COLUMNS = ['date', 'ville', 'type', 'modele', 'prix']
+
+# Bornes (s) de l'histogramme des durées de tâche (metrics:task_duration),
+# exposé par /metrics de l'API. Seule définition : elles sont enregistrées
+# avec l'histogramme
+TASK_DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Intervalle (s) entre deux relevés de pile en profilage par échantillonnage
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+
+# Statistiques cProfile cumulées par job dans ce processus (jobs les plus récents)
+PROFILED_JOBS_KEPT = 10
+job_profiles = OrderedDict()
+
+# Signature des fichiers Arrow IPC (format Feather v2)
+ARROW_MAGIC = b'ARROW1'
+
+# Durée de conservation (s) des résultats de tâche et de l'état intermédiaire
+# d'un job ; 0 pour les conserver indéfiniment
+JOB_STATE_TTL = int(os.environ.get('JOB_STATE_TTL', 3600))
+
+# Copie identique de observe_histogram dans orchestrator/main.py (chaque service a sa
+# propre image) : toute modification doit être reportée dans les deux
+def observe_histogram(pipe, key, buckets, value):
+    """Ajoute une observation à un histogramme stocké dans un hash Redis.
+
+    Un compteur par intervalle (non cumulé, cumulé à l'exposition), la somme
+    et le nombre d'observations, ainsi que les bornes elles-mêmes (champ
+    `bounds`) : l'API les expose telles quelles, sans en garder de copie.
+    Quatre commandes dans le pipeline en cours.
+    """
+    bucket = next((str(bound) for bound in buckets if value <= bound), '+Inf')
+    pipe.hincrby(key, bucket, 1)
+    pipe.hincrbyfloat(key, 'sum', value)
+    pipe.hincrby(key, 'count', 1)
+    pipe.hset(key, 'bounds', ','.join(str(bound) for bound in buckets))
+
+def sample_stacks(thread_id, samples, stop_event):
+    """Relève la pile d'appels du thread `thread_id` toutes les PROFILE_INTERVAL secondes.
+
+    Chaque pile est comptée au format replié (racine;...;feuille) des
+    flamegraphs.
+    """
+    while not stop_event.wait(PROFILE_INTERVAL):
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+            frame = frame.f_back
+        # Relevé fait pendant l'arrêt du profilage : hors de la tâche
+        if stack and not stop_event.is_set():
+            samples[';'.join(reversed(stack))] += 1
+
+def start_profiler(mode):
+    """Démarre le profilage de la tâche en cours ('sampling' ou 'cprofile'), ou rien si `mode` est vide."""
+    if not mode:
+        return None
+    
+    if mode == 'cprofile':
+        profile = cProfile.Profile()
+        profile.enable()
+        return {'mode': mode, 'profile': profile}
     
-    # Créer une colonne année-mois
-    df['month'] = df['date'].dt.strftime('%Y-%m')
+    samples = Counter()
+    stop_event = threading.Event()
+    sampler = threading.Thread(target=sample_stacks, args=(threading.get_ident(), samples, stop_event), daemon=True)
+    sampler.start()
+    return {'mode': 'sampling', 'samples': samples, 'stop_event': stop_event, 'sampler': sampler}
+
+def stop_profiler(profiler):
+    """Arrête le profilage ; renvoie (mode, profil cProfile ou compteurs de piles), ou None."""
+    if profiler is None:
+        return None
     
-    # Calcul du CA mensuel par ville
-    result = df.groupby(['ville', 'month'])['prix'].sum().reset_index()
+    if profiler['mode'] == 'cprofile':
+        profiler['profile'].disable()
+        return 'cprofile', profiler['profile']
     
-    # Transformation en format dictionnaire
-    monthly_revenue = {}
-    for _, row in result.iterrows():
-        city = row['ville']
-        month = row['month']
-        revenue = float(row['prix'])
-        
-        if city not in monthly_revenue:
-            monthly_revenue[city] = {}
-        
-        monthly_revenue[city][month] = revenue
+    profiler['stop_event'].set()
+    profiler['sampler'].join()
+    return 'sampling', profiler['samples']
+
+def record_profile(pipe, job_id, profile):
+    """Ajoute le profil d'une tâche au pipeline d'écriture de ses résultats.
+
+    Piles échantillonnées : leurs compteurs sont ajoutés (HINCRBY) à
+    job:<id>:profile_stacks, Redis cumulant ainsi les profils de tous les
+    workers. cProfile : les statistiques des tâches du job traitées par ce
+    processus sont cumulées en mémoire et remplacent son entrée dans
+    job:<id>:profile_stats (format marshal de pstats).
+    """
+    mode, data = profile
+    if mode == 'cprofile':
+        stats = job_profiles.pop(job_id, None)
+        if stats is None:
+            stats = pstats.Stats(data)
+        else:
+            stats.add(data)
+        job_profiles[job_id] = stats
+        while len(job_profiles) > PROFILED_JOBS_KEPT:
+            job_profiles.popitem(last=False)
+        key = f"job:{job_id}:profile_stats"
+        pipe.hset(key, WORKER_ID, marshal.dumps(stats.stats))
+    else:
+        key = f"job:{job_id}:profile_stacks"
+        for stack, count in data.items():
+            pipe.hincrby(key, stack, count)
     
-    return monthly_revenue
+    if JOB_STATE_TTL:
+        pipe.expire(key, JOB_STATE_TTL)
 
-def calculate_sales_rental_distribution(df):
-    """Calcule la répartition vente/location par ville."""
-    # Comptage des transactions par ville et type
-    result = df.groupby(['ville', 'type']).size().reset_index(name='count')
-    
-    # Transformation en format dictionnaire
-    distribution = {}
-    for _, row in result.iterrows():
-        city = row['ville']
-        transaction_type = row['type']
-        count = int(row['count'])
-        
-        if city not in distribution:
-            distribution[city] = {}
-        
-        distribution[city][transaction_type] = count
+def decode_payload(payload):
+    """Reconstruit le DataFrame d'une tâche (Arrow IPC ou JSON records)."""
+    if payload[:len(ARROW_MAGIC)] == ARROW_MAGIC:
+        return pd.read_feather(io.BytesIO(payload))
     
-    return distribution
+    return pd.read_json(io.StringIO(payload.decode('utf-8')), orient='records')
 
-def find_top_models(df):
-    """Détermine les 5 modèles les plus populaires par ville."""
-    # Comptage des modèles par ville
-    result = df.groupby(['ville', 'modele']).size().reset_index(name='count')
+def load_byte_range(descriptor):
+    """Parse uniquement la plage d'octets [start, end) du CSV partagé."""
+    with open(descriptor['path'], 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = mapped[descriptor['start']:descriptor['end']]
     
-    # Tri et sélection des top 5
-    top_models = {}
-    for city in result['ville'].unique():
-        city_data = result[result['ville'] == city]
-        top_5 = city_data.sort_values('count', ascending=False).head(5)
-        
-        top_models[city] = {}
-        for _, row in top_5.iterrows():
-            top_models[city][row['modele']] = int(row['count'])
+    return pd.read_csv(io.BytesIO(data), header=None, names=descriptor['columns'], usecols=SUMMARY_COLUMNS)
+
+def load_partition(descriptor):
+    """Lit la partie d'un fichier désignée par le descripteur.
+
+    Plage d'octets d'un CSV (format par défaut), fichier CSV compressé
+    complet, ou groupes de lignes d'un fichier Parquet. Seules les colonnes
+    utiles sont lues et seules les transactions du périmètre du job sont
+    conservées.
+    """
+    file_format = descriptor.get('format', 'csv')
+    if file_format == 'parquet':
+        df = pq.ParquetFile(descriptor['path']).read_row_groups(descriptor['row_groups'], columns=SUMMARY_COLUMNS).to_pandas()
+    elif file_format == 'csv.gz':
+        df = pd.read_csv(descriptor['path'], compression='gzip', usecols=SUMMARY_COLUMNS)
+    else:
+        df = load_byte_range(descriptor)
+    
+    return filter_scope(df, descriptor.get('scope'))
+
+# Copie identique de filter_scope dans orchestrator/main.py (chaque service a sa
+# propre image) : toute modification doit être reportée dans les deux
+def filter_scope(df, scope):
+    """Ne conserve que les transactions du périmètre du job : villes, type, dates (bornes incluses)."""
+    if not scope:
+        return df
+    
+    mask = pd.Series(True, index=df.index)
+    if scope.get('villes'):
+        mask &= df['ville'].isin(scope['villes'])
+    if scope.get('type'):
+        mask &= df['type'] == scope['type']
+    dates = pd.to_datetime(df['date']) if scope.get('date_from') or scope.get('date_to') else None
+    if scope.get('date_from'):
+        mask &= dates >= pd.Timestamp(scope['date_from'])
+    if scope.get('date_to'):
+        mask &= dates < pd.Timestamp(scope['date_to']) + pd.Timedelta(days=1)
+    return df[mask]
+
+def summarize_chunk(df):
+    """Agrège le chunk en une seule passe groupby (ville, mois, type, modèle).
+
+    Le mois est un code entier AAAAMM calculé de façon vectorisée ; les
+    réducteurs ci-dessous ne travaillent plus que sur ce résumé compact.
+    """
+    dates = pd.to_datetime(df['date'])
+    month = (dates.dt.year * 100 + dates.dt.month).rename('month')
+    
+    # dropna=False : une valeur manquante sur une clé ne doit pas retirer la
+    # ligne des autres indicateurs
+    return df.groupby([df['ville'], month, df['type'], df['modele']], observed=True, sort=False, dropna=False)['prix'].agg(['sum', 'size'])
+
+def format_month(code):
+    """Convertit un code mois AAAAMM en clé 'AAAA-MM'."""
+    code = int(code)
+    return f"{code // 100:04d}-{code % 100:02d}"
+
+def to_nested_dict(series, format_key=None):
+    """Convertit une série indexée par (ville, clé) en dictionnaire imbriqué."""
+    nested = {}
+    for (city, key), value in zip(series.index, series.tolist()):
+        if format_key:
+            key = format_key(key)
+        nested.setdefault(city, {})[key] = value
     
-    return top_models
+    return nested
+
+def process_monthly_revenue_by_city(summary):
+    """Calcule le chiffre d'affaires mensuel par ville."""
+    revenue = summary['sum'].groupby(level=['ville', 'month'], observed=True).sum()
+    return to_nested_dict(revenue, format_month)
+
+def calculate_sales_rental_distribution(summary):
+    """Calcule la répartition vente/location par ville."""
+    counts = summary['size'].groupby(level=['ville', 'type'], observed=True).sum()
+    return to_nested_dict(counts)
+
+def count_models_by_city(summary):
+    """Compte toutes les transactions par modèle et par ville.
+
+    Les comptages complets sont transmis (et non un top 5 local) pour que le
+    classement fusionné par l'aggregator soit exact quel que soit le découpage.
+    """
+    counts = summary['size'].groupby(level=['ville', 'modele'], observed=True).sum()
+    return to_nested_dict(counts.sort_values(ascending=False, kind='stable'))
+
+def process_task(task_id, descriptor=None, picked_at=None):
+    """Traite une tâche spécifique.
 
-def process_task(task_id):
-    """Traite une tâche spécifique."""
+    Sans descripteur, les données sont lues depuis Redis ; avec un descripteur
+    (plage d'octets ou partition d'un jeu multi-fichiers), elles sont lues
+    directement dans les fichiers partagés. Renvoie le span de la tâche
+    (durée de chaque phase), ou None si ses données sont introuvables.
+    """
     print(f"Traitement de la tâche {task_id}")
+    start_time = time.time()
+    phases = {}
+    phase_start = time.perf_counter()
     
     # Extraction de l'ID du job
     job_id = task_id.split(':')[1]
     
-    # Récupération des données
-    data_json = redis_client.get(task_id)
-    if not data_json:
-        print(f"Données introuvables pour la tâche {task_id}")
-        return False
-    
-    # Conversion JSON en DataFrame
-    df = pd.read_json(data_json.decode('utf-8'), orient='records')
-    print(f"Tâche {task_id}: {len(df)} transactions à traiter")
-    
-    # Calculs
-    results = {
-        'ca_mensuel_ville': process_monthly_revenue_by_city(df),
-        'repartition_vente_location': calculate_sales_rental_distribution(df),
-        'top_models': find_top_models(df)
+    payload_bytes = 0
+    profiler = None
+    try:
+        if descriptor:
+            fingerprint = descriptor.get('fingerprint')
+            profiler = start_profiler(descriptor.get('profile'))
+            # Lecture et parsing du fichier : une seule phase
+            df = load_partition(descriptor)
+            phases['fetch'] = time.perf_counter() - phase_start
+        else:
+            # Récupération des données et de l'empreinte du chunk (cache des résultats)
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.get(task_id)
+            pipe.hget(f"job:{job_id}:fingerprints", task_id)
+            # Mode de profilage du job, lu dans le même aller-retour
+            pipe.hget(f"job:{job_id}", 'profile')
+            data_json, fingerprint, profile_mode = pipe.execute()
+            if not data_json:
+                # Payload supprimé : tâche déjà traitée (relance après expiration
+                # du bail) ou job purgé
+                print(f"Données introuvables pour la tâche {task_id}")
+                return None
+            phases['fetch'] = time.perf_counter() - phase_start
+            profiler = start_profiler(profile_mode.decode('utf-8') if profile_mode else None)
+            
+            # Conversion du payload en DataFrame
+            phase_start = time.perf_counter()
+            payload_bytes = len(data_json)
+            df = decode_payload(data_json)
+            phases['decode'] = time.perf_counter() - phase_start
+        print(f"Tâche {task_id}: {len(df)} transactions à traiter")
+        
+        # Calculs à partir d'un résumé unique du chunk
+        phase_start = time.perf_counter()
+        summary = summarize_chunk(df)
+        phases['summarize'] = time.perf_counter() - phase_start
+        results = {}
+        phases['reducers'] = {}
+        for key, reducer in (('ca_mensuel_ville', process_monthly_revenue_by_city),
+                             ('repartition_vente_location', calculate_sales_rental_distribution),
+                             ('model_counts', count_models_by_city)):
+            phase_start = time.perf_counter()
+            results[key] = reducer(summary)
+            phases['reducers'][key] = time.perf_counter() - phase_start
+        
+        # Stockage des résultats, publication pour l'agrégation incrémentale
+        # et marquage de la tâche comme terminée
+        phase_start = time.perf_counter()
+        results_json = json.dumps(results)
+        phases['serialize'] = time.perf_counter() - phase_start
+    finally:
+        # Aussi en cas d'erreur : le thread d'échantillonnage ne doit pas survivre à la tâche
+        profile = stop_profiler(profiler)
+    
+    duration = time.time() - start_time
+    phase_start = time.perf_counter()
+    pipe = redis_client.pipeline()
+    pipe.set(f"{task_id}:results", results_json, ex=JOB_STATE_TTL or None)
+    pipe.xadd(RESULTS_STREAM, {'job_id': job_id, 'task_id': task_id, 'results': results_json},
+              maxlen=RESULTS_STREAM_MAXLEN, approximate=True)
+    # HSET plutôt qu'INCRBY : une tâche relancée ne compte ses lignes qu'une fois
+    pipe.hset(f"job:{job_id}:task_rows", task_id, len(df))
+    pipe.sadd(f"job:{job_id}:completed_tasks", task_id)
+    # Réveille l'orchestrator bloqué sur la liste de notifications du job
+    pipe.rpush(f"job:{job_id}:completion_events", task_id)
+    # Le payload n'est plus utile une fois le résultat stocké (même transaction)
+    if payload_bytes:
+        pipe.delete(task_id)
+        pipe.hincrby(f"job:{job_id}", 'reclaimed_bytes', payload_bytes)
+    # Résultat mis en cache sous l'empreinte du chunk, pour les jobs suivants
+    # (l'orchestrator gère l'éviction)
+    if fingerprint:
+        if isinstance(fingerprint, bytes):
+            fingerprint = fingerprint.decode('utf-8')
+        pipe.hset(f"chunk_cache:{fingerprint}", mapping={'results': results_json, 'rows': len(df)})
+        pipe.zadd('chunk_cache:lru', {fingerprint: time.time()})
+        pipe.hset('chunk_cache:sizes', fingerprint, len(results_json))
+    # L'état intermédiaire du job expire même si l'orchestrator disparaît
+    if JOB_STATE_TTL:
+        for key in ('task_rows', 'completed_tasks', 'completion_events'):
+            pipe.expire(f"job:{job_id}:{key}", JOB_STATE_TTL)
+    # Débit mesuré, utilisé par l'orchestrator pour dimensionner les tâches
+    if duration > 0:
+        pipe.hset('workers:throughput', WORKER_ID, len(df) / duration)
+    pipe.zadd('workers:heartbeat', {WORKER_ID: time.time()})
+    # Métriques par processus
+    pipe.hincrby('workers:tasks_processed', WORKER_ID, 1)
+    pipe.hincrby('workers:rows_processed', WORKER_ID, len(df))
+    observe_histogram(pipe, 'metrics:task_duration', TASK_DURATION_BUCKETS, duration)
+    if profile:
+        record_profile(pipe, job_id, profile)
+    pipe.execute()
+    phases['write'] = time.perf_counter() - phase_start
+    
+    print(f"Tâche {task_id} terminée avec succès")
+    return {
+        'task_id': task_id,
+        'worker_id': WORKER_ID,
+        'picked_at': picked_at,
+        'started_at': start_time,
+        'ended_at': time.time(),
+        'rows': len(df),
+        'payload_bytes': payload_bytes,
+        'phases': phases
     }
+
+def renew_lease(item, stop_event):
+    """Prolonge le bail de la tâche tant qu'elle est en cours de traitement."""
+    while not stop_event.wait(LEASE_TIMEOUT / 3):
+        pipe = redis_client.pipeline()
+        pipe.zadd('task_leases', {item: time.time() + LEASE_TIMEOUT}, xx=True)
+        pipe.zadd('workers:heartbeat', {WORKER_ID: time.time()})
+        pipe.execute()
+
+def run_task_item(item, picked_at=None):
+    """Traite un élément de la file (identifiant de tâche ou descripteur de plage)."""
+    if item.startswith('{'):
+        # Descripteur de plage d'octets ou de partition (modes référence et partitionné)
+        descriptor = json.loads(item)
+        return process_task(descriptor['task_id'], descriptor, picked_at)
+    
+    return process_task(item, picked_at=picked_at)
+
+def run_leased_task(item, picked_at=None):
+    """Traite une tâche sous bail, puis l'acquitte.
+
+    Si le worker s'arrête avant l'acquittement, le bail expire et
+    l'orchestrator remet la tâche dans task_queue. Le span de la tâche est
+    enregistré avec l'acquittement (job:<id>:spans), sans aller-retour
+    supplémentaire.
+    """
+    pipe = redis_client.pipeline()
+    pipe.zadd('task_leases', {item: time.time() + LEASE_TIMEOUT})
+    pipe.hset('task_owners', item, WORKER_ID)
+    pipe.execute()
     
-    # Stockage des résultats dans Redis
-    redis_client.set(f"{task_id}:results", json.dumps(results))
+    stop_event = threading.Event()
+    heartbeat = threading.Thread(target=renew_lease, args=(item, stop_event), daemon=True)
+    heartbeat.start()
+    try:
+        span = run_task_item(item, picked_at)
+    except Exception as e:
+        # Le bail n'est pas libéré : la tâche sera relancée à son expiration
+        print(f"Erreur lors du traitement de {item[:100]}: {str(e)}")
+        return
+    finally:
+        stop_event.set()
     
-    # Marquer la tâche comme terminée
-    redis_client.sadd(f"job:{job_id}:completed_tasks", task_id)
+    # Acquittement ; si le bail a expiré entre-temps et que la tâche a été
+    # reprise par un autre worker, son bail à lui est conservé
+    owner = redis_client.hget('task_owners', item)
+    pipe = redis_client.pipeline()
+    pipe.lrem(PROCESSING_KEY, 1, item)
+    if owner is None or owner.decode('utf-8') == WORKER_ID:
+        pipe.zrem('task_leases', item)
+        pipe.hdel('task_owners', item)
+        pipe.hdel('task_attempts', item)
+    if span:
+        spans_key = f"job:{span['task_id'].split(':')[1]}:spans"
+        pipe.hset(spans_key, span['task_id'], json.dumps(span))
+        if JOB_STATE_TTL:
+            pipe.expire(spans_key, JOB_STATE_TTL)
+    pipe.execute()
+
+def recover_processing_list():
+    """Remet en file les tâches laissées par une exécution précédente de ce worker."""
+    recovered = 0
+    while redis_client.lmove(PROCESSING_KEY, 'task_queue', 'RIGHT', 'RIGHT'):
+        recovered += 1
     
-    print(f"Tâche {task_id} terminée avec succès")
-    return True
+    if recovered:
+        print(f"Worker {WORKER_ID}: {recovered} tâche(s) non acquittée(s) remise(s) en file")
 
-def main():
-    print("Worker démarré, en attente de tâches...")
+def request_stop(signum, frame):
+    """Demande l'arrêt du worker après la tâche en cours."""
+    stop_requested.set()
+
+def run_worker_loop():
+    """Boucle de traitement : prend les tâches tant que l'arrêt n'est pas demandé."""
+    print(f"Worker {WORKER_ID} démarré, en attente de tâches...")
+    # File de traitement surveillée par l'orchestrator : une tâche prise
+    # sans bail (arrêt juste après BLMOVE) y est retrouvée et remise en file
+    redis_client.sadd('workers:processing_keys', PROCESSING_KEY)
+    recover_processing_list()
     
-    while True:
-        # Récupération d'une tâche depuis la file d'attente
-        task = redis_client.brpop('task_queue', timeout=1)
+    while not stop_requested.is_set():
+        # Signale à l'orchestrator que le worker est disponible
+        # (et réinscrit sa file de traitement, retirée si le worker a été
+        # considéré comme disparu)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zadd('workers:heartbeat', {WORKER_ID: time.time()})
+        pipe.sadd('workers:processing_keys', PROCESSING_KEY)
+        pipe.execute()
         
-        if task:
-            task_id = task[1].decode('utf-8')
-            process_task(task_id)
-        else:
-            time.sleep(1)
+        # Récupération d'une tâche depuis la file d'attente (attente bloquante,
+        # la tâche est prise dès son arrivée). BLMOVE la conserve dans la file de
+        # traitement du worker jusqu'à son acquittement
+        item = redis_client.blmove('task_queue', PROCESSING_KEY, 5, 'RIGHT', 'LEFT')
+        
+        if item:
+            run_leased_task(item.decode('utf-8'), time.time())
+    
+    # Le worker n'est plus compté parmi les workers vivants
+    redis_client.zrem('workers:heartbeat', WORKER_ID)
+    print(f"Worker {WORKER_ID} arrêté")
+
+def run_pool_process(index):
+    """Point d'entrée d'un processus du pool, avec son propre identifiant et sa propre file."""
+    global WORKER_ID, PROCESSING_KEY
+    WORKER_ID = f"{WORKER_ID}-{index}"
+    PROCESSING_KEY = f"processing:{WORKER_ID}"
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    run_worker_loop()
+
+def run_pool(concurrency):
+    """Lance et supervise WORKER_CONCURRENCY processus de traitement.
+
+    Chaque processus prend ses tâches indépendamment dans task_queue et
+    utilise son propre pool de connexions Redis (partagé avec son thread de
+    renouvellement de bail). Un processus arrêté anormalement est relancé ;
+    à l'arrêt du conteneur, le signal est relayé à tous les processus.
+    """
+    print(f"Worker {WORKER_ID}: démarrage de {concurrency} processus de traitement")
+    processes = {}
+    
+    while not stop_requested.is_set():
+        for index in range(concurrency):
+            process = processes.get(index)
+            if process is None or not process.is_alive():
+                if process is not None:
+                    print(f"Worker {WORKER_ID}: processus {index} arrêté (code {process.exitcode}), redémarrage")
+                process = multiprocessing.Process(target=run_pool_process, args=(index,))
+                process.start()
+                processes[index] = process
+        stop_requested.wait(1)
+    
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join()
+
+def main():
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    if WORKER_CONCURRENCY > 1:
+        run_pool(WORKER_CONCURRENCY)
+    else:
+        run_worker_loop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file